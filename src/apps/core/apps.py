@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from core import signals  # noqa: F401 регистрация обработчиков сигналов
+        from core.timing import install_execute_wrapper
+
+        connection_created.connect(install_execute_wrapper, dispatch_uid="core.timing")
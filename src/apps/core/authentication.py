@@ -0,0 +1,117 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from core.metrics import TOKEN_CACHE
+
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def token_cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def token_cache_key(key):
+    """Ключ кэша по хэшу токена, сам токен в кэш не попадает."""
+    return 'auth:token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def forget_token(key):
+    """Удаляет токен из кэша, следующий запрос с ним пойдет в БД."""
+    token_cache().delete(token_cache_key(key))
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    TOKEN_CACHE.labels(name).inc()
+
+
+def token_cache_stats():
+    """Счетчики попаданий и промахов кэша токенов в этом процессе."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, кэширующая токен вместе с пользователем.
+
+    Запись удаляется при удалении токена и при любом сохранении пользователя
+    (см. core.signals), поэтому удаленный токен или деактивированный
+    пользователь перестают проходить проверку сразу. Для нескольких
+    процессов TOKEN_CACHE_ALIAS должен указывать на общий backend.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = token_cache()
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            _count('misses')
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+        else:
+            _count('hits')
+
+        return self._check_active(token)
+
+    @staticmethod
+    def _check_active(token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+
+class AsyncCachedTokenAuthentication(CachedTokenAuthentication):
+    """CachedTokenAuthentication для асинхронных обработчиков.
+
+    Кэш и записи те же, что у синхронной версии; кэш читается через
+    aget/aset, а при промахе токен с пользователем загружается aget.
+    """
+
+    async def aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache = token_cache()
+        cache_key = token_cache_key(key)
+        token = await cache.aget(cache_key)
+        if token is None:
+            _count('misses')
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            await cache.aset(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+        else:
+            _count('hits')
+
+        return self._check_active(token)
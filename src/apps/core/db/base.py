@@ -0,0 +1,26 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core.metrics import DB_CONNECTION_ERRORS, DB_CONNECTION_SECONDS
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Backend PostgreSQL, учитывающий время получения соединения.
+
+    С пулом (OPTIONS["pool"]) это ожидание свободного соединения, без
+    пула - установка нового соединения с Postgres (TCP и аутентификация).
+    Ошибки, в том числе PoolTimeout при исчерпании пула, учитываются
+    отдельно.
+    """
+
+    def get_new_connection(self, conn_params):
+        source = 'pool' if self.pool else 'connect'
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        except Exception:
+            DB_CONNECTION_ERRORS.labels(self.alias, source).inc()
+            raise
+        finally:
+            DB_CONNECTION_SECONDS.labels(self.alias, source).observe(time.perf_counter() - start)
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from core.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+# Результат проверки по alias; время жизни задается при записи, чтобы работал override_settings
+health_cache = TTLCache(maxsize=8, ttl=settings.HEALTH_CHECK_TTL)
+_check_lock = threading.Lock()
+
+
+def ping_database(alias='default'):
+    """Выполняет SELECT 1, при необходимости открывая соединение, и возвращает время ответа в секундах.
+
+    После ошибки соединение вне транзакции закрывается, чтобы следующая
+    попытка открыла новое, а не получила ту же ошибку от разорванного.
+    """
+    connection = connections[alias]
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        if not connection.in_atomic_block:
+            connection.close()
+        raise
+    return time.perf_counter() - started
+
+
+def check_database(alias='default'):
+    """Состояние БД для /healthz и /readyz, кэшируется на HEALTH_CHECK_TTL секунд.
+
+    Пока результат в кэше, пробы не обращаются к БД; одновременные пробы
+    после его истечения ждут одну общую проверку.
+    """
+    result = health_cache.get(alias)
+    if result is None:
+        with _check_lock:
+            result = health_cache.get(alias)
+            if result is None:
+                result = _check(alias)
+                health_cache.set(alias, result, settings.HEALTH_CHECK_TTL)
+    return result
+
+
+def _check(alias):
+    result = {'status': 'ok', 'database': {}}
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is not None:
+        stats = pool.get_stats()
+        result['pool'] = {
+            'size': stats['pool_size'],
+            'available': stats['pool_available'],
+            'max': stats['pool_max'],
+            'waiting': stats.get('requests_waiting', 0),
+        }
+        if result['pool']['waiting'] > settings.HEALTH_POOL_MAX_WAITING:
+            # Проверка встала бы в ту же очередь и только добавила нагрузки
+            result.update(status='unavailable', reason='pool saturated')
+            return result
+
+    try:
+        latency = ping_database(alias)
+    except DatabaseError as exc:
+        logger.warning('Проверка БД %s не прошла: %s', alias, exc)
+        result.update(status='unavailable', reason='database unavailable')
+        return result
+    finally:
+        if pool is not None:
+            connections[alias].close()  # соединение сразу возвращается в пул
+
+    result['database']['latency_ms'] = round(latency * 1000, 2)
+    if latency > settings.HEALTH_DB_LATENCY_LIMIT:
+        result.update(status='unavailable', reason='database slow')
+    return result
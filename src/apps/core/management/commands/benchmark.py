@@ -0,0 +1,207 @@
+import json
+import logging
+import statistics
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import bump_user_version
+
+
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "baseline.json"
+SCENARIOS = (
+    "recipes_list", "recipes_detail", "recipes_filter_tags", "recipes_filter_ingredients",
+    "tags_assigned_only", "ingredients_assigned_only", "recipes_upload_image",
+)
+
+
+class Command(BaseCommand):
+    """Django команда для замера задержек API на данных seed_data.
+
+    Каждый сценарий выполняется для пользователей с наибольшим, медианным
+    и наименьшим числом рецептов. Для сценария сохраняются p50/p95/p99
+    и число SQL-запросов; с базовым файлом сравниваются число запросов
+    (любой рост - регрессия) и p95 (рост больше --tolerance).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="seed", help="Префикс email пользователей seed_data.")
+        parser.add_argument("--iterations", type=int, default=30, help="Замеров на сценарий.")
+        parser.add_argument("--warmup", type=int, default=3, help="Запросов на прогрев перед замерами.")
+        parser.add_argument(
+            "--scenario", action="append", choices=SCENARIOS, help="Выполнить только указанные сценарии."
+        )
+        parser.add_argument(
+            "--warm-cache", action="store_true", help="Не сбрасывать кэш ответов перед каждым запросом."
+        )
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Файл с базовыми результатами.")
+        parser.add_argument("--save-baseline", action="store_true", help="Записать результаты как базовые.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимый относительный рост p95.")
+        parser.add_argument("--output", help="Записать результаты в JSON.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("--iterations должен быть не меньше 2")
+        self.options = options
+        logging.getLogger("core.timing").setLevel(logging.WARNING)  # строка лога на каждый замер не нужна
+        users = self._users(options["prefix"])
+        self.client = Client(HTTP_HOST=self._host())
+
+        results = {}
+        for size, user in users.items():
+            self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {Token.objects.get_or_create(user=user)[0].key}"
+            for scenario in options["scenario"] or SCENARIOS:
+                results[f"{scenario}[{size}]"] = self._measure(user, getattr(self, f"_{scenario}")(user))
+
+        report = {
+            "dataset": {
+                "users": get_user_model().objects.filter(email__startswith=f"{options['prefix']}-").count(),
+                "recipes": Recipe.objects.filter(user__email__startswith=f"{options['prefix']}-").count(),
+                "sizes": {size: user.recipe_total for size, user in users.items()},
+            },
+            "scenarios": results,
+        }
+        if options["output"]:
+            self._write(options["output"], report)
+        if options["save_baseline"]:
+            self._write(options["baseline"], report)
+            self._print(results, {})
+            self.stdout.write(self.style.SUCCESS(f"Базовые результаты записаны в {options['baseline']}"))
+            return
+
+        baseline = self._read_baseline(options["baseline"])
+        if baseline and baseline.get("dataset") != report["dataset"]:
+            self.stdout.write(self.style.WARNING("Данные отличаются от базовых, сравнение приблизительное"))
+        regressions = self._print(results, baseline.get("scenarios", {}))
+        if regressions:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def _users(self, prefix):
+        """Пользователи с наибольшим, медианным и наименьшим числом рецептов."""
+        users = list(
+            get_user_model().objects.filter(email__startswith=f"{prefix}-")
+            .annotate(recipe_total=Count("recipe"))
+            .filter(recipe_total__gt=0)
+            .order_by("-recipe_total", "id")
+        )
+        if not users:
+            raise CommandError(f"Нет данных с префиксом {prefix}, сначала выполните seed_data")
+        return {"large": users[0], "medium": users[len(users) // 2], "small": users[-1]}
+
+    @staticmethod
+    def _host():
+        """Имя хоста, которое пропустит ALLOWED_HOSTS."""
+        for host in settings.ALLOWED_HOSTS:
+            if host and "*" not in host and not host.startswith("."):
+                return host
+        return "testserver"
+
+    def _measure(self, user, request):
+        """Прогрев, затем iterations замеров задержки и числа запросов."""
+        timings, queries = [], 0
+        for i in range(self.options["warmup"] + self.options["iterations"]):
+            if not self.options["warm_cache"]:
+                bump_user_version(user.pk)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = request(i)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f"{response.status_code} для {response.request['PATH_INFO']}")
+            if i >= self.options["warmup"]:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(ctx.captured_queries))
+
+        p50, p95, p99 = (statistics.quantiles(timings, n=100, method="inclusive")[i] for i in (49, 94, 98))
+        return {"p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2), "queries": queries}
+
+    # Сценарии: по пользователю возвращают функцию, выполняющую i-й запрос
+
+    def _recipes_list(self, user):
+        url = reverse("recipe:recipe-list")
+        return lambda i: self.client.get(url)
+
+    def _recipes_detail(self, user):
+        ids = list(Recipe.objects.filter(user=user).order_by("id").values_list("id", flat=True)[:10])
+        return lambda i: self.client.get(reverse("recipe:recipe-detail", args=[ids[i % len(ids)]]))
+
+    def _recipes_filter_tags(self, user):
+        return self._filter(user, Tag, "tags")
+
+    def _recipes_filter_ingredients(self, user):
+        return self._filter(user, Ingredient, "ingredients")
+
+    def _filter(self, user, model, param):
+        """Фильтр по двум самым частым тегам или ингредиентам пользователя."""
+        ids = model.objects.filter(user=user).order_by("-recipe_count", "id").values_list("id", flat=True)[:2]
+        url = reverse("recipe:recipe-list")
+        query = {param: ",".join(map(str, ids))}
+        return lambda i: self.client.get(url, query)
+
+    def _tags_assigned_only(self, user):
+        url = reverse("recipe:tag-list")
+        return lambda i: self.client.get(url, {"assigned_only": 1})
+
+    def _ingredients_assigned_only(self, user):
+        url = reverse("recipe:ingredient-list")
+        return lambda i: self.client.get(url, {"assigned_only": 1})
+
+    def _recipes_upload_image(self, user):
+        recipe_id = Recipe.objects.filter(user=user).order_by("id").values_list("id", flat=True).first()
+        url = reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+        def upload(i):
+            # Новое изображение на каждый запрос, иначе хранилище только увеличит счетчик ссылок
+            buffer = BytesIO()
+            Image.new("RGB", (640, 480), (i % 256, i // 256 % 256, 128)).save(buffer, format="JPEG")
+            image = SimpleUploadedFile("bench.jpg", buffer.getvalue(), content_type="image/jpeg")
+            return self.client.post(url, {"image": image})
+
+        return upload
+
+    def _print(self, results, baseline):
+        """Выводит таблицу результатов и возвращает сценарии с регрессией."""
+        regressions = []
+        self.stdout.write(f"{'сценарий':40} {'p50':>9} {'p95':>9} {'p99':>9} {'запросы':>8}  базовый p95")
+        for name, result in results.items():
+            base = baseline.get(name)
+            status = ""
+            if base is not None:
+                slower = result["p95_ms"] > base["p95_ms"] * (1 + self.options["tolerance"])
+                more_queries = result["queries"] > base["queries"]
+                status = f"{base['p95_ms']:9.2f}"
+                if slower or more_queries:
+                    regressions.append(name)
+                    status = self.style.ERROR(f"{status}  регрессия (запросов было {base['queries']})")
+            self.stdout.write(
+                f"{name:40} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+                f"{result['queries']:8}  {status}"
+            )
+        return regressions
+
+    @staticmethod
+    def _read_baseline(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def _write(path, report):
+        with open(path, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
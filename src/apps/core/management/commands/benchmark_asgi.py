@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import logging
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.management.commands.benchmark import Command as BenchmarkCommand
+from core.models import Recipe
+from recipe.cache import bump_user_version
+
+
+ENDPOINTS = {
+    "recipes_list": "recipe-list",
+    "recipes_detail": "recipe-detail",
+    "tags_list": "tag-list",
+    "ingredients_list": "ingredient-list",
+}
+
+
+class Command(BaseCommand):
+    """Django команда для сравнения пропускной способности синхронных и асинхронных маршрутов под ASGI.
+
+    Запросы подаются прямо в config.asgi.application, как это делает
+    ASGI-сервер, но без сети: --concurrency задач в одном цикле событий
+    отправляют --requests запросов к синхронному маршруту и столько же
+    к асинхронному. Данные - самый большой пользователь seed_data.
+    Без пула каждый одновременный запрос держит свое соединение с БД,
+    поэтому --concurrency не должен превышать max_connections.
+
+    С пулом (DB_POOL=1) выводится статистика пула: очередь, среднее
+    ожидание, тайм-ауты и замененные соединения. С --break-connections
+    в середине каждого замера все простаивающие соединения разрываются
+    на стороне Postgres, запросы после этого должны пройти без ошибок.
+    Ошибки запросов и тайм-ауты пула завершают команду с ошибкой.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="seed", help="Префикс email пользователей seed_data.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов.")
+        parser.add_argument("--requests", type=int, default=500, help="Запросов на маршрут.")
+        parser.add_argument("--endpoint", action="append", choices=ENDPOINTS, help="Только указанные маршруты.")
+        parser.add_argument(
+            "--warm-cache", action="store_true", help="Не сбрасывать кэш ответов перед каждым запросом."
+        )
+        parser.add_argument(
+            "--break-connections", action="store_true",
+            help="Разрывать простаивающие соединения с БД в середине каждого замера.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < options["concurrency"]:
+            raise CommandError("Нужно --concurrency >= 1 и --requests >= --concurrency")
+        from config.asgi import application
+
+        self.application = application
+        self.options = options
+        logging.getLogger("core.timing").setLevel(logging.WARNING)
+
+        user = (
+            get_user_model().objects.filter(email__startswith=f"{options['prefix']}-")
+            .annotate(recipe_total=Count("recipe")).order_by("-recipe_total", "id").first()
+        )
+        if user is None:
+            raise CommandError(f"Нет данных с префиксом {options['prefix']}, сначала выполните seed_data")
+        self.user = user
+        self.headers = [
+            (b"host", BenchmarkCommand._host().encode()),
+            (b"authorization", f"Token {Token.objects.get_or_create(user=user)[0].key}".encode()),
+        ]
+        recipe_id = Recipe.objects.filter(user=user).order_by("id").values_list("id", flat=True).first()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            self.own_pid = cursor.fetchone()[0]
+        if connection.pool:
+            connection.pool.pop_stats()  # только статистика замеров
+
+        self.stdout.write(
+            f"{user.email}: {user.recipe_total} рецептов, {options['concurrency']} одновременных запросов"
+        )
+        # Настройки загружены без config/asgi.py: как там, соединения потоков запросов не сохраняются
+        max_age, connection.settings_dict["CONN_MAX_AGE"] = connection.settings_dict["CONN_MAX_AGE"], 0
+        try:
+            failures = self._compare(recipe_id)
+        finally:
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+        if failures:
+            raise CommandError(f"Ошибки запросов или тайм-ауты пула: {', '.join(failures)}")
+
+    def _compare(self, recipe_id):
+        """Замеры синхронного и асинхронного маршрута для каждого эндпоинта, возвращает сбойные."""
+        self.stdout.write(f"{'маршрут':30} {'запросов/с':>11} {'p50':>9} {'p95':>9} {'ошибки':>7}")
+        failures = []
+        for endpoint in self.options["endpoint"] or ENDPOINTS:
+            args = (recipe_id,) if endpoint.endswith("_detail") else ()
+            rates = {}
+            for route in ("", "async-"):
+                path = reverse(f"recipe:{route}{ENDPOINTS[endpoint]}", args=args)
+                result = asyncio.run(self._run(path))
+                rates[route] = result["rps"]
+                label = f"{endpoint} ({'async' if route else 'sync'})"
+                self.stdout.write(
+                    f"{label:30} {result['rps']:11.1f} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                    f"{result['errors']:7}"
+                )
+                self._print_connections(result)
+                if result["errors"] or result["pool"].get("requests_errors"):
+                    failures.append(label)
+            self.stdout.write(f"{'':30} {rates['async-'] / rates['']:10.2f}x")
+        return failures
+
+    async def _run(self, path):
+        """Выполняет --requests запросов задачами по --concurrency, возвращает req/s и задержки."""
+        numbers = itertools.count()
+        timings, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            while next(numbers) < self.options["requests"]:
+                if not self.options["warm_cache"]:
+                    bump_user_version(self.user.pk)
+                started = time.perf_counter()
+                status = await self._request(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                errors += status >= 400
+
+        started, broken = time.perf_counter(), 0
+        await asyncio.gather(*(worker() for _ in range(self.options["concurrency"])))
+        if self.options["break_connections"]:
+            # Все запросы завершены, соединения пула простаивают
+            broken = await asyncio.to_thread(self._break_connections)
+            numbers = itertools.count()
+            await asyncio.gather(*(worker() for _ in range(self.options["concurrency"])))
+        elapsed = time.perf_counter() - started
+
+        p50, p95 = (statistics.quantiles(timings, n=100, method="inclusive")[i] for i in (49, 94))
+        return {
+            "rps": len(timings) / elapsed, "p50_ms": p50, "p95_ms": p95, "errors": errors,
+            "broken": broken, "pool": connection.pool.pop_stats() if connection.pool else {},
+        }
+
+    def _break_connections(self):
+        """Разрывает простаивающие соединения с БД, кроме соединения команды, как при обрыве сети."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity"
+                    " WHERE datname = current_database() AND state = 'idle'"
+                    " AND pid NOT IN (pg_backend_pid(), %s)",
+                    [self.own_pid],
+                )
+                return cursor.fetchone()[0]
+        finally:
+            connection.close()  # соединение этого потока, с пулом возвращается в пул
+
+    def _print_connections(self, result):
+        stats = result["pool"]
+        if stats:
+            queued = stats.get("requests_queued", 0)
+            wait = stats.get("requests_wait_ms", 0) / queued if queued else 0
+            self.stdout.write(
+                f"{'':4}пул: {stats['pool_size']}/{stats['pool_max']} соединений, в очереди {queued}, "
+                f"ожидание {wait:.1f} мс, тайм-аутов {stats.get('requests_errors', 0)}, "
+                f"заменено {stats.get('returns_bad', 0) + stats.get('connections_lost', 0)}"
+            )
+        if self.options["break_connections"]:
+            self.stdout.write(f"{'':4}разорвано соединений: {result['broken']}")
+
+    async def _request(self, path):
+        """Один GET через ASGI-приложение, возвращает статус ответа."""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": self.headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 80),
+        }
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        response = {}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Future()  # клиент не отключается, ожидание отменит обработчик
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+
+        await self.application(scope, receive, send)
+        return response["status"]
@@ -0,0 +1,26 @@
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from core.models import ImageUpload
+
+
+class Command(BaseCommand):
+    """Django команда для удаления незавершенных загрузок изображений."""
+
+    def handle(self, *args, **options):
+        directory = settings.RECIPE_UPLOAD_DIR
+        # Список файлов берется до списка сессий: сессия создается раньше своего файла
+        files = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+
+        deleted, _ = ImageUpload.objects.expired().delete()
+        active = {f'{pk}.part' for pk in ImageUpload.objects.values_list('pk', flat=True)}
+        # Вместе с просроченными удаляются файлы сессий, удаленных с рецептом
+        for name in files - active:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f"Удалено загрузок: {deleted}, файлов: {len(files - active)}"))
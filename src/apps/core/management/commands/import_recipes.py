@@ -0,0 +1,214 @@
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from core.models import Ingredient, Recipe, Tag
+from core.signals import recipes_bulk_saved
+
+
+RECIPE_FIELDS = ("title", "time_minutes", "price", "link")
+# Поля, которые не приходят из файла и не проверяются при разборе строки
+SKIP_VALIDATION = ("user", "image", "image_derivatives", "search_vector")
+MAX_NAME_LENGTH = Tag._meta.get_field("name").max_length
+
+
+class Command(BaseCommand):
+    """Django команда для массовой загрузки рецептов из JSONL.
+
+    Каждая строка - рецепт в формате выгрузки /recipes/export/?format=ndjson
+    с email владельца в поле "user" (или --user для всего файла). Теги и
+    ингредиенты указываются именами и создаются при необходимости.
+    После каждого пакета позиция в файле сохраняется в файл контрольной
+    точки, и повторный запуск продолжает с нее.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Файл JSONL с рецептами.")
+        parser.add_argument("--user", help="Email владельца для строк без поля user.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Рецептов в одной транзакции.")
+        parser.add_argument("--checkpoint", help="Файл контрольной точки (по умолчанию <file>.checkpoint).")
+        parser.add_argument("--restart", action="store_true", help="Начать сначала, игнорируя контрольную точку.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size должен быть положительным")
+        self.default_user = options["user"]
+        self.users = {}  # email -> пользователь
+        self.names = {Tag: {}, Ingredient: {}}  # модель -> {(user_id, lower(name)): id}
+        checkpoint_path = options["checkpoint"] or f"{options['file']}.checkpoint"
+        state = {"offset": 0, "line": 0, "recipes": 0}
+        if not options["restart"] and os.path.exists(checkpoint_path):
+            state = self._load_checkpoint(checkpoint_path)
+            self.stdout.write(f"Продолжение со строки {state['line'] + 1}")
+
+        try:
+            source = open(options["file"], "rb")
+        except OSError as e:
+            raise CommandError(f"Не удалось открыть файл: {e}")
+
+        started, imported = time.monotonic(), 0
+        with source:
+            source.seek(state["offset"])
+            while True:
+                lines = list(islice(source, options["batch_size"]))
+                if not lines:
+                    break
+
+                items = self._parse(lines, first_line=state["line"] + 1)
+                done = {
+                    "offset": state["offset"] + sum(len(line) for line in lines),
+                    "line": state["line"] + len(lines),
+                    "recipes": state["recipes"] + len(items),
+                }
+                with transaction.atomic():
+                    last_id = self._import(items)
+                    # Точка с отметкой пишется до фиксации: если сбой случится между фиксацией
+                    # и записью итоговой точки, по last_id видно, что пакет уже в БД
+                    self._save_checkpoint(checkpoint_path, {**state, "pending": {**done, "recipe_id": last_id}})
+                state = done
+                self._save_checkpoint(checkpoint_path, state)
+
+                imported += len(items)
+                rate = imported / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"Загружено рецептов: {state['recipes']} ({rate:.0f} строк/с)")
+
+        if os.path.exists(checkpoint_path):
+            os.unlink(checkpoint_path)  # файл загружен целиком
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {imported} рецептов за {elapsed:.1f} с ({imported / max(elapsed, 1e-6):.0f} строк/с)"
+        ))
+
+    def _parse(self, lines, first_line):
+        """Разбирает и проверяет строки пакета до записи в БД."""
+        items = []
+        for number, line in enumerate(lines, first_line):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("ожидался объект")
+                recipe = Recipe(**{field: data[field] for field in RECIPE_FIELDS if field in data})
+                recipe.clean_fields(exclude=SKIP_VALIDATION)
+            except (ValueError, TypeError) as e:
+                raise CommandError(f"Строка {number}: некорректный JSON ({e})")
+            except ValidationError as e:
+                raise CommandError(f"Строка {number}: {'; '.join(e.messages)}")
+
+            email = data.get("user", self.default_user)
+            if not email:
+                raise CommandError(f"Строка {number}: не указан пользователь")
+            item = {"number": number, "email": email, "recipe": recipe}
+            for field in ("tags", "ingredients"):
+                names = data.get(field) or []
+                if not isinstance(names, list) or not all(
+                    isinstance(name, str) and 0 < len(name) <= MAX_NAME_LENGTH for name in names
+                ):
+                    raise CommandError(f"Строка {number}: {field} должен быть списком непустых имен")
+                item[field] = names
+            items.append(item)
+
+        self._resolve_users(items)
+        for item in items:
+            item["recipe"].user = self.users[item["email"]]
+        return items
+
+    def _resolve_users(self, items):
+        """Дополняет кэш пользователей одним запросом на пакет."""
+        missing = {item["email"] for item in items} - self.users.keys()
+        if not missing:
+            return
+        User = get_user_model()
+        self.users.update((user.email, user) for user in User.objects.filter(email__in=missing).only("id", "email"))
+        for item in items:
+            if item["email"] not in self.users:
+                raise CommandError(f"Строка {item['number']}: пользователь {item['email']} не найден")
+
+    def _resolve_names(self, model, field, items):
+        """Id тегов или ингредиентов по именам; в БД идут только новые для команды имена."""
+        known = self.names[model]
+        missing = {}
+        for item in items:
+            user = item["recipe"].user
+            for name in item[field]:
+                if (user.pk, name.lower()) not in known:
+                    missing.setdefault(user.pk, (user, []))[1].append(name)
+
+        for user, names in missing.values():
+            for pk, name, _ in model.objects.get_or_create_many(user, names):
+                known[(user.pk, name.lower())] = pk
+
+        return [
+            list(dict.fromkeys(known[(item["recipe"].user.pk, name.lower())] for name in item[field]))
+            for item in items
+        ]
+
+    def _import(self, items):
+        """Записывает пакет рецептов и их связей фиксированным числом запросов, возвращает id последнего."""
+        tag_ids = self._resolve_names(Tag, "tags", items)
+        ingredient_ids = self._resolve_names(Ingredient, "ingredients", items)
+        recipes = Recipe.objects.bulk_create([item["recipe"] for item in items])
+
+        affected = {}
+        for through, column, ids in (
+            (Recipe.tags.through, "tag_id", tag_ids),
+            (Recipe.ingredients.through, "ingredient_id", ingredient_ids),
+        ):
+            # Связей в несколько раз больше, чем рецептов, и id им не нужны: COPY без ORM
+            links = [(recipe.pk, pk) for recipe, recipe_ids in zip(recipes, ids) for pk in recipe_ids]
+            copy_rows(through._meta.db_table, ("recipe_id", column), links)
+            affected[column] = {pk for _, pk in links}
+
+        recipes_bulk_saved.send(
+            sender=Recipe,
+            user_ids={recipe.user_id for recipe in recipes},
+            recipe_ids=[recipe.pk for recipe in recipes],
+            tag_ids=affected["tag_id"],
+            ingredient_ids=affected["ingredient_id"],
+        )
+        return recipes[-1].pk if recipes else None
+
+    @staticmethod
+    def _load_checkpoint(path):
+        """Позиция продолжения; незавершенная отметка принимается, только если ее пакет зафиксирован."""
+        with open(path) as f:
+            state = json.load(f)
+        pending = state.pop("pending", None)
+        if pending is not None:
+            recipe_id = pending.pop("recipe_id")
+            if recipe_id is None or Recipe.objects.filter(pk=recipe_id).exists():
+                state = pending  # пакет в БД, итоговую точку записать не успели
+        return state
+
+    @staticmethod
+    def _save_checkpoint(path, state):
+        """Записывает контрольную точку атомарно, чтобы сбой не оставил обрезанный файл."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+
+def copy_rows(table, columns, rows):
+    """Записывает строки целых чисел в таблицу через COPY FROM STDIN."""
+    if not rows:
+        return
+    data = "".join("\t".join(map(str, row)) + "\n" for row in rows)
+    sql = "COPY {} ({}) FROM STDIN".format(
+        connection.ops.quote_name(table), ", ".join(connection.ops.quote_name(c) for c in columns)
+    )
+    with connection.cursor() as cursor:
+        if is_psycopg3:
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+        else:
+            cursor.copy_expert(sql, io.StringIO(data))
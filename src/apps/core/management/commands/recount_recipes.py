@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand, CommandError
+from django.db.models import F
+
+from core.models import Ingredient, Tag
+
+
+class Command(BaseCommand):
+    """Django команда для пересчета recipe_count тегов и ингредиентов."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true", help="Только сообщить о расхождениях, ничего не исправляя."
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Tag, Ingredient):
+            drift = list(
+                model.objects.with_actual_recipe_count()
+                .exclude(recipe_count=F("actual_recipe_count"))
+                .order_by("pk")
+                .values_list("pk", "recipe_count", "actual_recipe_count")
+            )
+            total += len(drift)
+            label = model._meta.verbose_name_plural
+            if not drift:
+                self.stdout.write(f"{label}: расхождений нет")
+                continue
+
+            sample = ", ".join(f"id={pk}: {stored} вместо {actual}" for pk, stored, actual in drift[:10])
+            self.stdout.write(self.style.WARNING(f"{label}: расхождений {len(drift)} ({sample})"))
+            if not options["check"]:
+                model.objects.filter(pk__in=[pk for pk, _, _ in drift]).recount()
+
+        if total and options["check"]:
+            raise CommandError(f"Найдено расхождений: {total}")
+        self.stdout.write(self.style.SUCCESS("Счетчики рецептов пересчитаны" if total else "Счетчики рецептов верны"))
@@ -0,0 +1,111 @@
+import json
+import os
+import random
+import tempfile
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+
+from core.models import Ingredient, Recipe, Tag
+
+
+TAG_WORDS = (
+    "Завтрак", "Обед", "Ужин", "Десерт", "Веган", "Быстро", "Праздник", "Детям",
+    "Постное", "Острое", "Выпечка", "Гриль", "Без глютена", "Бюджетно", "Пикник",
+)
+INGREDIENT_WORDS = (
+    "Соль", "Сахар", "Мука", "Яйцо", "Молоко", "Масло", "Лук", "Чеснок", "Морковь",
+    "Картофель", "Рис", "Гречка", "Курица", "Говядина", "Тофу", "Сыр", "Томат",
+    "Огурец", "Перец", "Лимон", "Имбирь", "Грибы", "Капуста", "Свекла", "Яблоко",
+)
+DISH_WORDS = ("Суп", "Салат", "Рагу", "Пирог", "Запеканка", "Паста", "Каша", "Омлет", "Плов", "Соус")
+
+
+def vocabulary(words, size):
+    """Список из size различных имен на основе слов: «Соль», ..., «Соль 1», ..."""
+    return [
+        words[i % len(words)] if i < len(words) else f"{words[i % len(words)]} {i // len(words)}"
+        for i in range(size)
+    ]
+
+
+def zipf_weights(size, skew):
+    """Накопленные веса закона Ципфа для random.choices(cum_weights=...)."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """Django команда для генерации тестовых данных.
+
+    Число рецептов у пользователей распределено по закону Ципфа: у первого
+    --max-recipes, у k-го max_recipes / k^skew. Теги и ингредиенты берутся
+    из общих словарей, частые имена встречаются чаще. При одинаковом --seed
+    данные совпадают, поэтому на них можно сравнивать замеры benchmark.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Число пользователей.")
+        parser.add_argument("--max-recipes", type=int, default=5000, help="Рецептов у самого активного пользователя.")
+        parser.add_argument("--skew", type=float, default=1.1, help="Показатель закона Ципфа.")
+        parser.add_argument("--tags", type=int, default=200, help="Размер общего словаря тегов.")
+        parser.add_argument("--ingredients", type=int, default=1000, help="Размер общего словаря ингредиентов.")
+        parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора.")
+        parser.add_argument("--prefix", default="seed", help="Префикс email пользователей: <prefix>-<n>@example.com.")
+        parser.add_argument("--password", default="seedpass", help="Пароль пользователей.")
+        parser.add_argument("--output", help="Сохранить сгенерированный JSONL (формат import_recipes).")
+
+    def handle(self, *args, **options):
+        if options["users"] <= 0 or options["max_recipes"] <= 0:
+            raise CommandError("--users и --max-recipes должны быть положительными")
+        User = get_user_model()
+        emails = [f"{options['prefix']}-{n}@example.com" for n in range(1, options["users"] + 1)]
+        if User.objects.filter(email__in=emails).exists():
+            raise CommandError(f"Пользователи с префиксом {options['prefix']} уже есть, укажите другой --prefix")
+
+        password = make_password(options["password"])  # хэш один на всех, иначе генерация упрется в хэширование
+        User.objects.bulk_create(User(email=email, name=email.split("@")[0], password=password) for email in emails)
+
+        if options["output"]:
+            self._generate(options["output"], emails, options)
+            self._load(options["output"])
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "seed.jsonl")
+                self._generate(path, emails, options)
+                self._load(path)
+
+    def _generate(self, path, emails, options):
+        rng = random.Random(options["seed"])
+        tags = vocabulary(TAG_WORDS, options["tags"])
+        ingredients = vocabulary(INGREDIENT_WORDS, options["ingredients"])
+        tag_weights = zipf_weights(len(tags), options["skew"])
+        ingredient_weights = zipf_weights(len(ingredients), options["skew"])
+
+        total = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for rank, email in enumerate(emails, 1):
+                count = max(1, int(options["max_recipes"] / rank ** options["skew"]))
+                for _ in range(count):
+                    recipe_ingredients = rng.choices(ingredients, cum_weights=ingredient_weights, k=rng.randint(2, 8))
+                    row = {
+                        "user": email,
+                        "title": f"{rng.choice(DISH_WORDS)} {recipe_ingredients[0].lower()}",
+                        "time_minutes": rng.randint(5, 180),
+                        "price": f"{rng.uniform(1, 500):.2f}",
+                        "tags": rng.choices(tags, cum_weights=tag_weights, k=rng.randint(0, 4)),
+                        "ingredients": recipe_ingredients,
+                    }
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                total += count
+
+        self.stdout.write(f"Сгенерировано: {len(emails)} пользователей, {total} рецептов")
+
+    def _load(self, path):
+        call_command("import_recipes", path, restart=True, stdout=self.stdout, stderr=self.stderr)
+        # Без свежей статистики планировщик выбирает планы для пустых таблиц и замеры врут
+        with connection.cursor() as cursor:
+            for model in (Recipe, Recipe.tags.through, Recipe.ingredients.through, Tag, Ingredient):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
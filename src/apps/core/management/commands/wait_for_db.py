@@ -1,21 +1,40 @@
 import time
 
-from django.db import connections
+from django.core.management import BaseCommand, CommandError
 from django.db.utils import OperationalError
-from django.core.management import BaseCommand
+
+from core.health import ping_database
 
 
 class Command(BaseCommand):
-    """Django команда для ожидания доступности базы данных."""
+    """Django команда для ожидания доступности базы данных.
+
+    Открывает соединение и выполняет SELECT 1. Пока база недоступна,
+    попытки повторяются с паузой, которая удваивается от --delay до
+    --max-delay; через --timeout секунд команда завершается с ошибкой.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Alias базы данных.")
+        parser.add_argument("--timeout", type=float, default=60, help="Сколько ждать, секунды.")
+        parser.add_argument("--delay", type=float, default=0.5, help="Первая пауза между попытками, секунды.")
+        parser.add_argument("--max-delay", type=float, default=5, help="Наибольшая пауза между попытками, секунды.")
 
     def handle(self, *args, **options):
         self.stdout.write("Ожидание базы данных...")
-        db_conn = None
-        while not db_conn:  # Пока не установлено соединение с базой данных
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["delay"]
+        while True:
             try:
-                db_conn = connections["default"]  # Подключение к базе данных по умолчанию
-            except OperationalError:
-                self.stdout.write("База данных недоступна, ожидание 1 секунду...")  # Вывод сообщения в консоль
-                time.sleep(1)
+                latency = ping_database(options["database"])
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f"База данных недоступна дольше {options['timeout']:g} с: {exc}")
+                pause = min(delay, remaining)
+                self.stdout.write(f"База данных недоступна, ожидание {pause:.1f} с...")
+                time.sleep(pause)
+                delay = min(delay * 2, options["max_delay"])
 
-        self.stdout.write(self.style.SUCCESS("База данных доступна!"))
+        self.stdout.write(self.style.SUCCESS(f"База данных доступна! ({latency * 1000:.1f} мс)"))
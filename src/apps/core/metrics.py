@@ -0,0 +1,297 @@
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HEADER = struct.Struct('<Q')  # занятые байты файла
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+REGISTRY = []  # метрики в порядке объявления
+
+
+class MmapStore:
+    """Значения метрик одного процесса в файле, отображенном в память.
+
+    Формат: занятые байты, затем записи [длина ключа][ключ][выравнивание
+    до 8][double]. Новая запись сначала пишется целиком и только потом
+    учитывается в заголовке, поэтому читатель из другого процесса видит
+    только полностью записанные ключи. Пишет в файл один процесс.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        # Файл мог остаться от процесса с тем же pid: значения продолжаются
+        self._positions = dict(_read_entries(self._mm, positions=True))
+        self._used = _HEADER.unpack_from(self._mm, 0)[0] or _HEADER.size
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            _VALUE.pack_into(self._mm, position, _VALUE.unpack_from(self._mm, position)[0] + amount)
+
+    def items(self):
+        with self._lock:
+            return list(_read_entries(self._mm))
+
+    def _append(self, key):
+        data = key.encode('utf-8')
+        padded = _KEY_LENGTH.size + len(data)
+        padded += -padded % 8
+        end = self._used + padded + _VALUE.size
+        if end > len(self._mm):
+            self._grow(end)
+
+        _KEY_LENGTH.pack_into(self._mm, self._used, len(data))
+        self._mm[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(data)] = data
+        position = self._used + padded
+        _VALUE.pack_into(self._mm, position, 0.0)
+        _HEADER.pack_into(self._mm, 0, end)  # запись видна читателям только теперь
+
+        self._positions[key] = position
+        self._used = end
+        return position
+
+    def _grow(self, needed):
+        size = len(self._mm)
+        while size < needed:
+            size *= 2
+        self._mm.close()
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+
+class DictStore:
+    """Значения метрик в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def add(self, key, amount):
+        with self._lock:
+            self._values[key] += amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+def _read_entries(buffer, positions=False):
+    """Пары (ключ, значение) или (ключ, смещение значения) из буфера MmapStore."""
+    used = min(_HEADER.unpack_from(buffer, 0)[0], len(buffer))  # файл мог расти во время чтения
+    offset = _HEADER.size
+    while offset + _KEY_LENGTH.size <= used:
+        length = _KEY_LENGTH.unpack_from(buffer, offset)[0]
+        start = offset + _KEY_LENGTH.size
+        key = bytes(buffer[start:start + length]).decode('utf-8')
+        offset = start + length + (-(_KEY_LENGTH.size + length) % 8)
+        if offset + _VALUE.size > used:
+            break
+        yield key, offset if positions else _VALUE.unpack_from(buffer, offset)[0]
+        offset += _VALUE.size
+
+
+_store_lock = threading.Lock()
+_store_state = {'key': None, 'store': None}
+
+
+def _store():
+    """Хранилище текущего процесса; после fork процесс получает свой файл."""
+    key = (settings.METRICS_DIR, os.getpid())
+    if _store_state['key'] != key:
+        with _store_lock:
+            if _store_state['key'] != key:
+                directory = key[0]
+                _store_state['store'] = (
+                    MmapStore(os.path.join(directory, f'{key[1]}.db')) if directory else DictStore()
+                )
+                _store_state['key'] = key
+    return _store_state['store']
+
+
+def _collect():
+    """Значения по всем процессам: сумма файлов METRICS_DIR или память процесса."""
+    if not settings.METRICS_DIR:
+        return _store().items()
+
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            continue
+        if len(data) >= _HEADER.size:
+            for key, value in _read_entries(data):
+                totals[key] += value
+    return totals.items()
+
+
+def _key(sample, labels):
+    return json.dumps([sample, labels], ensure_ascii=False, separators=(',', ':'))
+
+
+class Metric:
+    """Метрика с метками; значения дочерних серий хранятся в _store()."""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name}: ожидались метки {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(values, self._child(dict(zip(self.labelnames, values))))
+        return child
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _child(self, labels):
+        return _CounterChild(_key(self.name, labels))
+
+
+class _CounterChild:
+    __slots__ = ('_key',)
+
+    def __init__(self, key):
+        self._key = key
+
+    def inc(self, amount=1):
+        _store().add(self._key, amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (math.inf,)
+
+    def _child(self, labels):
+        return _HistogramChild(
+            self.buckets,
+            [_key(f'{self.name}_bucket', {**labels, 'le': _format_value(b)}) for b in self.buckets],
+            _key(f'{self.name}_sum', labels),
+        )
+
+
+class _HistogramChild:
+    """Наблюдения хранятся по корзинам без накопления, накопление - при выводе."""
+    __slots__ = ('_buckets', '_bucket_keys', '_sum_key')
+
+    def __init__(self, buckets, bucket_keys, sum_key):
+        self._buckets = buckets
+        self._bucket_keys = bucket_keys
+        self._sum_key = sum_key
+
+    def observe(self, value):
+        store = _store()
+        store.add(self._bucket_keys[bisect_left(self._buckets, value)], 1)
+        store.add(self._sum_key, value)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def generate_latest():
+    """Все метрики в текстовом формате Prometheus."""
+    samples = defaultdict(list)
+    for key, value in _collect():
+        sample, labels = json.loads(key)
+        samples[sample].append((labels, value))
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        if metric.type == 'histogram':
+            lines.extend(_histogram_lines(metric, samples))
+        else:
+            for labels, value in sorted(samples.get(metric.name, ()), key=lambda s: tuple(s[0].values())):
+                lines.append(f'{metric.name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(metric, samples):
+    """Накопленные корзины, _sum и _count для каждой серии гистограммы."""
+    series = defaultdict(dict)
+    for labels, value in samples.get(f'{metric.name}_bucket', ()):
+        le = float(labels.pop('le'))
+        series[tuple(labels.items())][le] = value  # метки в порядке объявления, как у счетчиков
+    sums = {tuple(labels.items()): value for labels, value in samples.get(f'{metric.name}_sum', ())}
+
+    for labels in sorted(series):
+        total = 0
+        for bucket in metric.buckets:
+            total += series[labels].get(bucket, 0)
+            bucket_labels = _format_labels({**dict(labels), 'le': _format_value(bucket)})
+            yield f'{metric.name}_bucket{bucket_labels} {_format_value(total)}'
+        yield f'{metric.name}_sum{_format_labels(dict(labels))} {_format_value(sums.get(labels, 0))}'
+        yield f'{metric.name}_count{_format_labels(dict(labels))} {_format_value(total)}'
+
+
+REQUESTS = Counter(
+    'http_requests_total', 'Запросы по обработчику, методу и статусу.', ('view', 'method', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса.', ('view', 'method')
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL-запросов на один запрос.', ('view',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+RESPONSE_CACHE = Counter('response_cache_requests_total', 'Обращения к кэшу ответов.', ('result',))
+TOKEN_CACHE = Counter('token_cache_requests_total', 'Обращения к кэшу токенов.', ('result',))
+IMAGE_BYTES = Counter(
+    'recipe_image_bytes_total', 'Байт изображений, обработанных при построении копий.', ('kind',)
+)
+DB_CONNECTION_SECONDS = Histogram(
+    'db_connection_acquire_seconds', 'Получение соединения с БД: ожидание пула или новое соединение.',
+    ('alias', 'source'), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_CONNECTION_ERRORS = Counter(
+    'db_connection_errors_total', 'Ошибки получения соединения с БД, включая исчерпание пула.', ('alias', 'source')
+)
@@ -0,0 +1,108 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.metrics import REQUEST_DB_QUERIES, REQUEST_LATENCY, REQUESTS
+from core.timing import RequestTiming, activate, deactivate
+
+
+logger = logging.getLogger('core.timing')
+
+
+def view_name(view_func, method):
+    """Имя обработчика для логов: RecipeViewSet.list, UserViewSet.me, AsyncRecipeView.get, ..."""
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    actions = getattr(view_func, 'actions', None)  # только у ViewSet
+    action = actions.get(method.lower()) if actions else method.lower()
+    return f'{cls.__name__}.{action}'
+
+
+class RequestTimingMiddleware:
+    """Число SQL-запросов, время БД, сериализации и всего запроса.
+
+    Результат отдается заголовком Server-Timing, строкой лога core.timing
+    в формате ключ=значение и метриками core.metrics. Текст SQL собирается
+    только для доли запросов REQUEST_TIMING_SQL_SAMPLE_RATE. Запросы,
+    выполненные при отдаче потокового ответа (после возврата из
+    обработчика), не учитываются. Под ASGI работает асинхронно и не
+    добавляет перехода в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Синхронный process_view Django вызывал бы через sync_to_async
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with self._measure() as timing:
+            response = self.get_response(request)
+        return self._finish(request, response, timing, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with self._measure() as timing:
+            response = await self.get_response(request)
+        return self._finish(request, response, timing, time.perf_counter() - start)
+
+    @contextmanager
+    def _measure(self):
+        timing = RequestTiming(capture_sql=random.random() < settings.REQUEST_TIMING_SQL_SAMPLE_RATE)
+        token = activate(timing)  # запросы к БД учитывает core.timing.execute_wrapper
+        try:
+            yield timing
+        finally:
+            deactivate(token)
+
+    def _finish(self, request, response, timing, total):
+        view = getattr(request, 'timing_view', None) or 'unresolved'  # 404 до выбора обработчика
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_LATENCY.labels(view, request.method).observe(total)
+        REQUEST_DB_QUERIES.labels(view).observe(timing.queries)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={timing.db * 1000:.2f};desc="{timing.queries} queries"',
+                f'serializer;dur={timing.serializer * 1000:.2f}',
+                f'view;dur={total * 1000:.2f}',
+            ))
+        if logger.isEnabledFor(logging.INFO):
+            self._log(request, response, timing, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing_view = view_name(view_func, request.method)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request.timing_view = view_name(view_func, request.method)
+
+    @staticmethod
+    def _log(request, response, timing, total):
+        fields = {
+            'view': getattr(request, 'timing_view', None),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timing.queries,
+            'db_ms': round(timing.db * 1000, 2),
+            'serializer_ms': round(timing.serializer * 1000, 2),
+            'view_ms': round(total * 1000, 2),
+        }
+        message = ' '.join(f'{key}={value}' for key, value in fields.items())
+        if timing.sql is not None:
+            fields['sql'] = timing.sql
+            message += f' sql={json.dumps(timing.sql, ensure_ascii=False)}'
+        logger.info(message, extra={'timing': fields})
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vector(apps, schema_editor):
+    """Заполняет поисковый вектор для существующих рецептов.
+
+    Выражение записано здесь, а не взято из core.search, чтобы миграция
+    не менялась вместе с кодом приложения.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    Tag = apps.get_model('core', 'Tag')
+    Ingredient = apps.get_model('core', 'Ingredient')
+    config = settings.RECIPE_SEARCH_CONFIG
+
+    def names(model):
+        return Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(names=StringAgg('name', ' '))
+            .values('names')
+        )
+
+    Recipe.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(names(Ingredient), weight='B', config=config)
+        + SearchVector(names(Tag), weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'search_vector'], name='recipe_user_search_gin'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
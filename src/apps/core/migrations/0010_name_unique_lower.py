@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:37
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    """Сливает теги и ингредиенты с одинаковым (user, lower(name)).
+
+    Остается объект с наименьшим id, связи рецептов с дубликатами
+    переносятся на него, версии затронутых рецептов увеличиваются.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    quote = schema_editor.quote_name
+    for model_name, column in (('Tag', 'tag_id'), ('Ingredient', 'ingredient_id')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(model_name.lower() + 's').remote_field.through
+        table, through_table = quote(model._meta.db_table), quote(through._meta.db_table)
+        duplicates = f"""
+            SELECT id, keep_id FROM (
+                SELECT id, min(id) OVER (PARTITION BY user_id, lower(name)) AS keep_id
+                FROM {table}
+            ) ranked WHERE id <> keep_id
+        """
+        schema_editor.execute(f"""
+            UPDATE {quote(Recipe._meta.db_table)}
+            SET version = version + 1, updated_at = now()
+            WHERE id IN (
+                SELECT recipe_id FROM {through_table} WHERE {column} IN (SELECT id FROM ({duplicates}) d)
+            )
+        """)
+        schema_editor.execute(f"""
+            INSERT INTO {through_table} (recipe_id, {column})
+            SELECT link.recipe_id, d.keep_id FROM {through_table} link
+            JOIN ({duplicates}) d ON d.id = link.{column}
+            ON CONFLICT DO NOTHING
+        """)
+        schema_editor.execute(f"""
+            DELETE FROM {through_table} WHERE {column} IN (SELECT id FROM ({duplicates}) d)
+        """)
+        schema_editor.execute(f"""
+            DELETE FROM {table} WHERE id IN (SELECT id FROM ({duplicates}) d)
+        """)
+    # Отложенные проверки внешних ключей мешают создать индекс в той же транзакции
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(models.F('user'), django.db.models.functions.text.Lower('name'), name='ingredient_user_lower_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(models.F('user'), django.db.models.functions.text.Lower('name'), name='tag_user_lower_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:04
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Сохраненный файл',
+                'verbose_name_plural': 'Сохраненные файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.models.recipe_image_storage, upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:31
+
+from django.db import migrations
+
+
+# Таблица, внешний ключ, индекс Django по нему (восстанавливается при откате) и новый индекс.
+# Имена записаны явно: сгенерированные Django могут отличаться между версиями
+THROUGH_INDEXES = (
+    ('core_recipe_tags', 'tag_id', 'core_recipe_tags_tag_id_10c0ffea', 'recipe_tags_tag_recipe_idx'),
+    (
+        'core_recipe_ingredients', 'ingredient_id', 'core_recipe_ingredients_ingredient_id_a8fec9ee',
+        'recipe_ingredients_ingredient_recipe_idx',
+    ),
+)
+
+
+def single_column_indexes(schema_editor, table, column):
+    """Неуникальные индексы только по column, созданные Django для внешнего ключа."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key'] and info['columns'] == [column]
+    ]
+
+
+def add_reverse_indexes(apps, schema_editor):
+    """Заменяет индекс внешнего ключа на (ключ, recipe_id).
+
+    Уникальный (recipe_id, tag_id) обслуживает теги рецепта, обратный -
+    рецепты тега только по индексу. Индекс по одному tag_id он заменяет
+    полностью, а оставленный, тот перехватывал бы выбор планировщика.
+    """
+    quote = schema_editor.quote_name
+    for table, column, _, index in THROUGH_INDEXES:
+        for name in single_column_indexes(schema_editor, table, column):
+            schema_editor.execute(f'DROP INDEX {quote(name)}')
+        schema_editor.execute(f'CREATE INDEX {quote(index)} ON {quote(table)} ({quote(column)}, recipe_id)')
+
+
+def remove_reverse_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for table, column, fk_index, index in THROUGH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {quote(index)}')
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {quote(fk_index)} ON {quote(table)} ({quote(column)})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_image_upload'),
+    ]
+
+    # Таблицы связей создаются Django автоматически, поэтому индексы меняются SQL
+    operations = [
+        migrations.RunPython(add_reverse_indexes, remove_reverse_indexes),
+    ]
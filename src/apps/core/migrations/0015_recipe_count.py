@@ -0,0 +1,48 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+def fill_recipe_count(apps, schema_editor):
+    """Заполняет recipe_count по таблицам связей."""
+    Recipe = apps.get_model('core', 'Recipe')
+    quote = schema_editor.quote_name
+    for model_name in ('Tag', 'Ingredient'):
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(model_name.lower() + 's')
+        through = field.remote_field.through
+        schema_editor.execute(f"""
+            UPDATE {quote(model._meta.db_table)} t SET recipe_count = (
+                SELECT COUNT(*) FROM {quote(through._meta.db_table)} link
+                WHERE link.{quote(field.m2m_reverse_name())} = t.id
+            )
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_through_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_recipe_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='ingredient_user_count_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='tag_user_count_id_idx'),
+        ),
+    ]
@@ -1,19 +1,33 @@
 import uuid
 import os
+from datetime import timedelta
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from django.conf import settings
-from django.db import models
+from django.core.files.storage import storages
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.db.models.functions import Lower, Upper
+from django.utils import timezone
+
+
+RECIPE_IMAGE_DIR = 'uploads/recipe/'
+
+
+def recipe_image_storage():
+    """Хранилище изображений рецептов, задается в STORAGES["recipe_images"]."""
+    return storages['recipe_images']
 
 
 def recipe_image_file_path(instance, filename):
     """Генерирует путь для сохранения изображения рецепта."""
     ext = filename.split('.')[-1]  # получение расширения файла
     filename = f'{uuid.uuid4()}.{ext}'  # генерация уникального имени файла
-    return os.path.join('uploads/recipe/', filename)  # возвращает путь для сохранения файла
+    return os.path.join(RECIPE_IMAGE_DIR, filename)  # возвращает путь для сохранения файла
 
 
 class UserManager(BaseUserManager):
@@ -53,10 +67,79 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = 'Пользователи'
 
 
+class RecipeAttrQuerySet(models.QuerySet):
+    def get_or_create_many(self, user, names):
+        """Находит или создает объекты с заданными именами одним запросом.
+
+        Имена сравниваются без учета регистра, как в уникальном индексе
+        (user, lower(name)). Возвращает список (id, name, created) в порядке
+        первого вхождения имени, name - сохраненное в БД написание.
+        """
+        first = {}
+        for name in names:
+            first.setdefault(name.lower(), name)
+        unique = list(first.values())
+        if not unique:
+            return []
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        # Существующие строки выбираются по снимку до вставки, поэтому объединение
+        # с RETURNING дает каждое имя ровно один раз
+        sql = f"""
+            WITH input AS (
+                SELECT name FROM unnest(%s::text[]) AS name
+            ), inserted AS (
+                INSERT INTO {table} (user_id, name, recipe_count)
+                SELECT %s, name, 0 FROM input
+                ON CONFLICT (user_id, lower(name)) DO NOTHING
+                RETURNING id, name
+            )
+            SELECT id, name, true FROM inserted
+            UNION ALL
+            SELECT t.id, t.name, false FROM {table} t
+            JOIN input ON lower(t.name) = lower(input.name)
+            WHERE t.user_id = %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [unique, user.pk, user.pk])
+            rows = {name.lower(): (pk, name, created) for pk, name, created in cursor.fetchall()}
+
+        # Строки, вставленные параллельной транзакцией после нашего снимка
+        missing = [name for name in unique if name.lower() not in rows]
+        if missing:
+            lookup = self.filter(user=user).alias(lower_name=Lower('name'))
+            for pk, name in lookup.filter(lower_name__in=[n.lower() for n in missing]).values_list('pk', 'name'):
+                rows[name.lower()] = (pk, name, False)
+
+        return [rows[name.lower()] for name in unique]
+
+    def recipe_links(self):
+        """Связи с рецептами объекта внешнего запроса (OuterRef('pk'))."""
+        field = self.model.recipe_set.field  # Recipe.tags или Recipe.ingredients
+        return field.remote_field.through.objects.filter(**{field.m2m_reverse_field_name(): models.OuterRef('pk')})
+
+    def _actual_recipe_count(self):
+        return models.Subquery(self.recipe_links().order_by().annotate(
+            count=models.Func(models.F('pk'), function='COUNT', output_field=models.IntegerField())
+        ).values('count'))
+
+    def with_actual_recipe_count(self):
+        """Добавляет actual_recipe_count - число рецептов по таблице связей."""
+        return self.annotate(actual_recipe_count=self._actual_recipe_count())
+
+    def recount(self):
+        """Пересчитывает recipe_count по таблице связей."""
+        return self.update(recipe_count=self._actual_recipe_count())
+
+
 class Tag(models.Model):
     """Тег для рецепта."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Число рецептов с этим объектом, поддерживается сигналами, см. core.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -64,12 +147,26 @@ class Tag(models.Model):
     class Meta:
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='tag_user_name_id_idx'),
+            models.Index(fields=['user', 'recipe_count', 'id'], name='tag_user_count_id_idx'),
+            # Подсказки по префиксу и нечеткому совпадению, см. BaseRecipeAttrViewSet.suggest
+            GinIndex('user', OpClass(Upper('name'), name='gin_trgm_ops'), name='tag_user_name_trgm_idx'),
+        ]
+        constraints = [
+            # Без учета регистра; на него опирается ON CONFLICT в get_or_create_many
+            models.UniqueConstraint(models.F('user'), Lower('name'), name='tag_user_lower_name_uniq'),
+        ]
 
 
 class Ingredient(models.Model):
     """Ингредиент для рецепта."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Число рецептов с этим объектом, поддерживается сигналами, см. core.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -77,6 +174,22 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='ingredient_user_name_id_idx'),
+            models.Index(fields=['user', 'recipe_count', 'id'], name='ingredient_user_count_id_idx'),
+            # Подсказки по префиксу и нечеткому совпадению, см. BaseRecipeAttrViewSet.suggest
+            GinIndex('user', OpClass(Upper('name'), name='gin_trgm_ops'), name='ingredient_user_name_trgm_idx'),
+        ]
+        constraints = [
+            # Без учета регистра; на него опирается ON CONFLICT в get_or_create_many
+            models.UniqueConstraint(models.F('user'), Lower('name'), name='ingredient_user_lower_name_uniq'),
+        ]
+
+
+class RecipeQuerySet(models.QuerySet):
+    def touch(self, **fields):
+        """Отмечает рецепты измененными: увеличивает версию и updated_at."""
+        return self.update(version=models.F('version') + 1, updated_at=timezone.now(), **fields)
 
 
 class Recipe(models.Model):
@@ -88,7 +201,106 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path, storage=recipe_image_storage)
+    # Уменьшенные копии {размер: {формат: путь}}, строятся в фоне, см. recipe.images
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Название, ингредиенты и теги для полнотекстового поиска, см. core.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Растет при любом изменении рецепта и его связей, из нее строится ETag
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        """Сохраняет рецепт, увеличивая версию на стороне БД."""
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        self.version = models.F('version') + 1  # без гонки между параллельными сохранениями
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+    class Meta:
+        # Индексы под постраничный вывод по ключу (поле сортировки, id)
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='recipe_user_price_id_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'], name='recipe_user_time_id_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='recipe_user_title_id_idx'),
+            GinIndex(fields=['user', 'search_vector'], name='recipe_user_search_gin'),  # нужен btree_gin
+        ]
+
+
+class ImageUploadQuerySet(models.QuerySet):
+    def expired(self):
+        """Незавершенные загрузки старше RECIPE_UPLOAD_TTL."""
+        return self.filter(created_at__lt=timezone.now() - timedelta(seconds=settings.RECIPE_UPLOAD_TTL))
+
+
+class ImageUpload(models.Model):
+    """Сессия возобновляемой загрузки изображения рецепта по частям."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # объявленный размер файла
+    offset = models.PositiveBigIntegerField(default=0)  # сколько байт уже принято
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImageUploadQuerySet.as_manager()
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        """Файл с принятыми байтами."""
+        return os.path.join(settings.RECIPE_UPLOAD_DIR, f'{self.id}.part')
+
+    class Meta:
+        verbose_name = 'Загрузка изображения'
+        verbose_name_plural = 'Загрузки изображений'
+
+
+class StoredFileQuerySet(models.QuerySet):
+    def acquire(self, name):
+        """Добавляет ссылку на файл, создавая счетчик при первой."""
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, refcount) VALUES (%s, 1) '
+                f'ON CONFLICT (name) DO UPDATE SET refcount = {table}.refcount + 1',
+                [name],
+            )
+
+    def release(self, name):
+        """Убирает ссылку на файл; возвращает True, если файл больше не нужен.
+
+        Файлы без счетчика (загруженные до хранилища по хэшу) принадлежат
+        одному объекту и освобождаются сразу.
+        """
+        if not self.filter(name=name).update(refcount=models.F('refcount') - 1):
+            return True
+        deleted, _ = self.filter(name=name, refcount=0).delete()
+        return bool(deleted)
+
+
+class StoredFile(models.Model):
+    """Счетчик ссылок на файл в хранилище по хэшу содержимого."""
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    objects = StoredFileQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Сохраненный файл'
+        verbose_name_plural = 'Сохраненные файлы'
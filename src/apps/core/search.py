@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery
+
+
+def _names_subquery(model):
+    """Подзапрос, склеивающий имена связанных с рецептом объектов."""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def recipe_search_vector(tag_model, ingredient_model):
+    """Выражение для поля search_vector: название (A), ингредиенты (B), теги (C)."""
+    config = settings.RECIPE_SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(_names_subquery(ingredient_model), weight='B', config=config)
+        + SearchVector(_names_subquery(tag_model), weight='C', config=config)
+    )
+
+
+def update_search_vectors(recipe_ids, touch=False):
+    """Пересчитывает search_vector для рецептов одним UPDATE.
+
+    recipe_ids может быть списком id или подзапросом, возвращающим id.
+    С touch=True тем же запросом увеличивается версия рецептов.
+    """
+    from core.models import Ingredient, Recipe, Tag
+
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    vector = recipe_search_vector(Tag, Ingredient)
+    return recipes.touch(search_vector=vector) if touch else recipes.update(search_vector=vector)
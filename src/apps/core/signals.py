@@ -0,0 +1,135 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import forget_token
+from core.models import Ingredient, Recipe, Tag, User
+from core.search import update_search_vectors
+
+
+# Рецепты и их связи записаны массово (bulk_create/bulk_update), минуя
+# post_save и m2m_changed. Аргументы: user_ids, recipe_ids, tag_ids,
+# ingredient_ids - затронутые объекты, включая отвязанные теги и ингредиенты.
+recipes_bulk_saved = Signal()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    """Обновляет поисковый вектор при изменении названия рецепта."""
+    if update_fields is None or 'title' in update_fields:
+        update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет поисковый вектор и версию рецептов при изменении их тегов и ингредиентов."""
+    if action == 'pre_clear' and reverse:
+        # После очистки со стороны тега связанные рецепты уже не найти
+        instance._search_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') or (action == 'post_clear' and not reverse):
+        update_search_vectors(pk_set if reverse else [instance.pk], touch=True)
+    elif action == 'post_clear':
+        update_search_vectors(instance.__dict__.pop('_search_recipe_ids', []), touch=True)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_counts_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Поддерживает recipe_count тегов и ингредиентов при изменении связей.
+
+    pk_set при удалении содержит переданные id, а не удаленные связи,
+    поэтому существующие связи выбираются до удаления.
+    """
+    attr_model = type(instance) if reverse else model
+    column = attr_model.recipe_set.field.m2m_reverse_field_name()  # 'tag' или 'ingredient'
+    if reverse:
+        links = sender.objects.filter(**{column: instance})
+        if pk_set is not None:
+            links = links.filter(recipe__in=pk_set)
+    else:
+        links = sender.objects.filter(recipe=instance)
+        if pk_set is not None:
+            links = links.filter(**{f'{column}__in': pk_set})
+
+    if action in ('pre_remove', 'pre_clear'):
+        instance._recipe_count_links = list(links.values_list(f'{column}_id', 'recipe_id'))
+    elif action == 'post_add':
+        ids, delta = ([instance.pk], len(pk_set)) if reverse else (pk_set, 1)
+        _adjust_recipe_count(attr_model, ids, delta)
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop('_recipe_count_links', [])
+        ids, delta = ([instance.pk], len(removed)) if reverse else ([pk for pk, _ in removed], 1)
+        _adjust_recipe_count(attr_model, ids, -delta)
+
+
+def _adjust_recipe_count(model, ids, delta):
+    # Параллельные remove/clear одной связи обе видят ее до удаления и уменьшают
+    # счетчик дважды; без нижней границы PositiveIntegerField дал бы IntegrityError
+    if ids and delta:
+        model.objects.filter(pk__in=ids).update(recipe_count=Greatest(F('recipe_count') + delta, 0))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Уменьшает recipe_count тегов и ингредиентов удаляемого рецепта.
+
+    Связи удаляются каскадно без m2m_changed; сигнал приходит внутри
+    транзакции удаления.
+    """
+    for model in (Tag, Ingredient):
+        column = model.recipe_set.field.m2m_reverse_field_name()
+        links = model.recipe_set.through.objects.filter(recipe=instance).values(column)
+        _adjust_recipe_count(model, links, -1)
+
+
+@receiver(recipes_bulk_saved)
+def recipes_bulk_saved_search(sender, recipe_ids, **kwargs):
+    """Обновляет поисковый вектор массово записанных рецептов."""
+    update_search_vectors(recipe_ids)
+
+
+@receiver(recipes_bulk_saved)
+def recipes_bulk_saved_counts(sender, tag_ids, ingredient_ids, **kwargs):
+    """Пересчитывает recipe_count затронутых массовой записью тегов и ингредиентов."""
+    if tag_ids:
+        Tag.objects.filter(pk__in=tag_ids).recount()
+    if ingredient_ids:
+        Ingredient.objects.filter(pk__in=ingredient_ids).recount()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Обновляет поисковый вектор и версию рецептов при переименовании тега или ингредиента."""
+    if not created:
+        update_search_vectors(instance.recipe_set.values('pk'), touch=True)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Запоминает рецепты удаляемого тега или ингредиента."""
+    instance._search_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Обновляет поисковый вектор и версию рецептов удаленного тега или ингредиента."""
+    update_search_vectors(instance.__dict__.pop('_search_recipe_ids', []), touch=True)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Удаляет токен из кэша аутентификации."""
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Сбрасывает закэшированного пользователя, в том числе после деактивации."""
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        forget_token(key)
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+CONTENT_NAME_RE = re.compile(r'(^|/)([0-9a-f]{2}/)+[0-9a-f]{64}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    """Имя из ContentAddressedStorage: содержимое по нему никогда не меняется."""
+    return CONTENT_NAME_RE.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла - хэш его содержимого.
+
+    Файл `uploads/recipe/photo.jpg` сохраняется как
+    `uploads/recipe/ab/cd/<sha256>.jpg`: вложенные каталоги держат число
+    файлов в каждом небольшим, одинаковые загрузки разделяют одну копию.
+    Ссылки на копию считаются в core.StoredFile, файл удаляется с последней.
+    """
+
+    def __init__(self, shard_depth=2, shard_width=2, temp_dir='.tmp', **kwargs):
+        super().__init__(**kwargs)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.temp_dir = temp_dir
+
+    def get_available_name(self, name, max_length=None):
+        return name  # имя определяется содержимым, совпадение означает ту же копию
+
+    def content_name(self, name, digest):
+        """Имя файла по хэшу с разбиением на вложенные каталоги."""
+        shards = [digest[i * self.shard_width:(i + 1) * self.shard_width] for i in range(self.shard_depth)]
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(posixpath.dirname(name), *shards, digest + ext)
+
+    def _save(self, name, content):
+        from core.models import StoredFile
+
+        temp_path, digest = self._write_temp(content)
+        try:
+            name = self.content_name(name, digest)
+            path = self.path(name)
+            # Блокировка строки счетчика не дает параллельному delete() удалить файл,
+            # пока он не переименован на место
+            with transaction.atomic():
+                StoredFile.objects.acquire(name)
+                if not os.path.exists(path):
+                    self._makedirs(os.path.dirname(path))
+                    os.replace(temp_path, path)  # атомарно: читатели не видят недописанный файл
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        return name
+
+    def delete(self, name):
+        """Освобождает ссылку и удаляет файл, если ссылок не осталось."""
+        from core.models import StoredFile
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            if StoredFile.objects.release(name):
+                super().delete(name)
+
+    def _write_temp(self, content):
+        """Пишет содержимое во временный файл на том же диске и считает хэш."""
+        directory = self.path(self.temp_dir)
+        self._makedirs(directory)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path, digest.hexdigest()
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is not None:
+            # os.makedirs применяет mode с учетом umask, как и FileSystemStorage
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache_stats
+from core.metrics import generate_latest
+from .test_base import BaseTestCase
+from .test_metrics import sample
+
+
+User = get_user_model()
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class CachedTokenAuthenticationTests(BaseTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@appdev.com',
+            password='testpass',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_request_skips_token_query(self):
+        """Тест на аутентификацию повторного запроса без обращения к БД."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Тест на отказ сразу после удаления токена."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Тест на отказ сразу после деактивации пользователя."""
+        self.client.get(TAGS_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Тест на актуальные данные пользователя после изменения."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_invalid_token_rejected(self):
+        """Тест на отказ с несуществующим токеном."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_hit_rate_reported(self):
+        """Тест на подсчет попаданий в кэш."""
+        before = token_cache_stats()
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+        after = token_cache_stats()
+
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertGreater(after['hit_rate'], 0)
+
+    def test_hit_rate_in_metrics(self):
+        """Тест на попадания и промахи кэша токенов в /metrics."""
+        hits = 'token_cache_requests_total{result="hits"}'
+        misses = 'token_cache_requests_total{result="misses"}'
+        text = generate_latest()
+        before = (sample(text, hits) or 0, sample(text, misses) or 0)
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+
+        text = generate_latest()
+        self.assertEqual(sample(text, hits), before[0] + 1)
+        self.assertEqual(sample(text, misses), before[1] + 1)
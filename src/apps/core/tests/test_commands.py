@@ -1,22 +1,309 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.management.commands.import_recipes import Command as ImportRecipesCommand
+from core.models import ImageUpload, Ingredient, Recipe, Tag
 
 from .test_base import BaseTestCase
 
 
 class CommandTest(BaseTestCase):
     def test_wait_for_db_ready(self):
-        """Тест ожидания доступа базы данных, если она доступна."""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+        """Тест ожидания доступа базы данных, если она доступна: выполняется настоящий запрос."""
+        out = StringIO()
+        with patch("time.sleep") as ts:
+            call_command("wait_for_db", stdout=out)
+        ts.assert_not_called()
+        self.assertIn("База данных доступна!", out.getvalue())
 
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
-        """Тест ожидания базы данных, если она недоступна."""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+        """Тест ожидания базы данных, если она недоступна: пауза удваивается до --max-delay."""
+        with patch("core.management.commands.wait_for_db.ping_database") as ping:
+            ping.side_effect = [OperationalError] * 5 + [0.001]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ping.call_count, 6)
+        self.assertEqual([c.args[0] for c in ts.call_args_list], [0.5, 1, 2, 4, 5])
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Тест ошибки, если база данных недоступна дольше --timeout."""
+        with patch("core.management.commands.wait_for_db.ping_database") as ping:
+            ping.side_effect = OperationalError("connection refused")
+            with self.assertRaisesMessage(CommandError, "connection refused"):
+                call_command("wait_for_db", "--timeout", "0", stdout=StringIO())
+        ts.assert_not_called()
+
+    def test_clear_uploads(self):
+        """Тест удаления просроченных загрузок и файлов без сессии."""
+        user = get_user_model().objects.create_user('test@appdev.com', 'testpass')
+        recipe = Recipe.objects.create(user=user, title='Суп', time_minutes=5, price=1)
+        with tempfile.TemporaryDirectory() as directory, override_settings(RECIPE_UPLOAD_DIR=directory):
+            fresh = ImageUpload.objects.create(recipe=recipe, filename='a.jpg', size=10)
+            stale = ImageUpload.objects.create(recipe=recipe, filename='b.jpg', size=10)
+            ImageUpload.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=2))
+            orphan = os.path.join(directory, 'orphan.part')
+            for path in (fresh.path, stale.path, orphan):
+                open(path, 'wb').close()
+
+            call_command("clear_uploads")
+
+            self.assertEqual(list(ImageUpload.objects.all()), [fresh])
+            self.assertEqual(os.listdir(directory), [os.path.basename(fresh.path)])
+
+
+class ImportRecipesCommandTest(BaseTestCase):
+    """Тестирование массовой загрузки рецептов."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@appdev.com', 'testpass')
+        self.other = get_user_model().objects.create_user('other@appdev.com', 'testpass')
+        self.tag = Tag.objects.create(user=self.user, name='Веган')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'recipes.jsonl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, *rows):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write((row if isinstance(row, str) else json.dumps(row, ensure_ascii=False)) + '\n')
+
+    def test_import(self):
+        """Рецепты, теги и ингредиенты загружаются, существующие имена переиспользуются."""
+        self.write(
+            {'user': 'test@appdev.com', 'title': 'Тофу', 'time_minutes': 10, 'price': '5.00',
+             'tags': ['веган', 'Быстро'], 'ingredients': ['Тофу']},
+            {'user': 'other@appdev.com', 'title': 'Суп', 'time_minutes': 30, 'price': 2,
+             'tags': ['Веган']},
+            {'title': 'Чай', 'time_minutes': 3, 'price': '1.00', 'tags': ['быстро', 'Быстро']},
+        )
+        out = StringIO()
+
+        call_command('import_recipes', self.path, user='test@appdev.com', stdout=out)
+
+        self.assertIn('строк/с', out.getvalue())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        tofu = Recipe.objects.get(title='Тофу')
+        self.assertEqual(sorted(tofu.tags.values_list('name', flat=True)), ['Быстро', 'Веган'])
+        self.assertEqual(list(tofu.ingredients.values_list('name', flat=True)), ['Тофу'])
+        self.assertIsNotNone(tofu.search_vector)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        self.assertEqual(Tag.objects.get(user=self.user, name='Быстро').recipe_count, 2)
+        self.assertEqual(Tag.objects.filter(user=self.other).count(), 1)
+        self.assertEqual(Ingredient.objects.count(), 1)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_resume(self):
+        """После ошибки загрузка продолжается с первого незаписанного пакета."""
+        rows = [
+            {'title': f'Рецепт {i}', 'time_minutes': 1, 'price': '1.00', 'tags': ['Веган']} for i in range(3)
+        ]
+        self.write(*rows[:2], '{"title": "Сломанный"')
+
+        with self.assertRaisesMessage(CommandError, 'Строка 3'):
+            call_command('import_recipes', self.path, user='test@appdev.com', batch_size=2, stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 2)
+        with open(f'{self.path}.checkpoint') as f:
+            self.assertEqual(json.load(f)['line'], 2)
+
+        self.write(*rows)
+        call_command('import_recipes', self.path, user='test@appdev.com', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list('title', flat=True)),
+            ['Рецепт 0', 'Рецепт 1', 'Рецепт 2'],
+        )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 3)
+
+    def crash_import(self, crash):
+        """Загрузка пакетами по 2 строки, прерванная при записи контрольной точки, затем повторный запуск."""
+        rows = [{'title': f'Рецепт {i}', 'time_minutes': 1, 'price': '1.00', 'tags': ['Веган']} for i in range(3)]
+        self.write(*rows)
+        save = ImportRecipesCommand._save_checkpoint
+
+        def save_and_crash(path, state):
+            if crash(state):
+                if 'pending' in state:
+                    save(path, state)
+                raise RuntimeError('сбой')
+            save(path, state)
+
+        with patch.object(ImportRecipesCommand, '_save_checkpoint', side_effect=save_and_crash):
+            with self.assertRaisesMessage(RuntimeError, 'сбой'):
+                call_command('import_recipes', self.path, user='test@appdev.com', batch_size=2, stdout=StringIO())
+        call_command('import_recipes', self.path, user='test@appdev.com', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list('title', flat=True)),
+            ['Рецепт 0', 'Рецепт 1', 'Рецепт 2'],
+        )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 3)
+
+    def test_crash_after_commit(self):
+        """Сбой между фиксацией пакета и записью итоговой точки не загружает пакет повторно."""
+        self.crash_import(lambda state: 'pending' not in state)
+
+    def test_crash_before_commit(self):
+        """Сбой до фиксации пакета: пакет откатывается и загружается при повторном запуске."""
+        self.crash_import(lambda state: 'pending' in state)
+
+    def test_unknown_user(self):
+        """Строка с неизвестным пользователем останавливает загрузку до записи пакета."""
+        self.write(
+            {'user': 'test@appdev.com', 'title': 'Тофу', 'time_minutes': 10, 'price': '5.00'},
+            {'user': 'nobody@appdev.com', 'title': 'Суп', 'time_minutes': 30, 'price': '2.00'},
+        )
+
+        with self.assertRaisesMessage(CommandError, 'nobody@appdev.com'):
+            call_command('import_recipes', self.path, stdout=StringIO())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_fields(self):
+        """Значения полей проверяются как в модели."""
+        self.write({'title': 'Суп', 'time_minutes': 'долго', 'price': '2.00'})
+
+        with self.assertRaisesMessage(CommandError, 'Строка 1'):
+            call_command('import_recipes', self.path, user='test@appdev.com', stdout=StringIO())
+
+
+class SeedDataCommandTest(BaseTestCase):
+    """Тестирование генерации тестовых данных."""
+
+    def seed(self, prefix, **options):
+        call_command('seed_data', users=5, max_recipes=20, tags=10, ingredients=30, prefix=prefix,
+                     stdout=StringIO(), **options)
+
+    def test_zipf_distribution(self):
+        """Число рецептов убывает по закону Ципфа, словари общие для всех пользователей."""
+        self.seed('a')
+
+        counts = [
+            Recipe.objects.filter(user__email=f'a-{n}@example.com').count() for n in range(1, 6)
+        ]
+        self.assertEqual(counts, [20, 9, 5, 4, 3])
+        self.assertTrue(get_user_model().objects.get(email='a-1@example.com').check_password('seedpass'))
+        self.assertLessEqual(Tag.objects.values('name').distinct().count(), 10)
+        self.assertGreater(Recipe.objects.exclude(ingredients=None).count(), 0)
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+
+    def test_deterministic(self):
+        """При одинаковом seed данные совпадают."""
+        self.seed('a')
+        self.seed('b')
+
+        titles = [
+            list(Recipe.objects.filter(user__email__startswith=f'{prefix}-').order_by('id').values_list('title'))
+            for prefix in ('a', 'b')
+        ]
+        self.assertEqual(titles[0], titles[1])
+
+    def test_existing_prefix(self):
+        """Повторная генерация с тем же префиксом запрещена."""
+        self.seed('a')
+
+        with self.assertRaisesMessage(CommandError, 'уже есть'):
+            self.seed('a')
+
+
+class BenchmarkCommandTest(BaseTestCase):
+    """Тестирование замеров и сравнения с базовыми результатами."""
+    scenarios = ['recipes_list', 'recipes_detail', 'recipes_filter_tags', 'tags_assigned_only']
+
+    def setUp(self):
+        call_command('seed_data', users=3, max_recipes=10, tags=10, ingredients=20, stdout=StringIO())
+        self.directory = tempfile.TemporaryDirectory()
+        self.baseline = os.path.join(self.directory.name, 'baseline.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, **options):
+        call_command('benchmark', iterations=2, warmup=0, scenario=self.scenarios, baseline=self.baseline,
+                     stdout=StringIO(), **options)
+
+    def test_save_and_compare(self):
+        """Результаты сохраняются и без изменений не дают регрессий."""
+        self.benchmark(save_baseline=True)
+
+        with open(self.baseline) as f:
+            report = json.load(f)
+        self.assertEqual(report['dataset']['users'], 3)
+        self.assertEqual(set(report['dataset']['sizes']), {'large', 'medium', 'small'})
+        result = report['scenarios']['recipes_list[large]']
+        self.assertEqual(set(result), {'p50_ms', 'p95_ms', 'p99_ms', 'queries'})
+        self.assertGreater(result['queries'], 0)
+
+        for result in report['scenarios'].values():
+            result['p95_ms'] = 1e6  # сравнивается только число запросов
+        with open(self.baseline, 'w') as f:
+            json.dump(report, f)
+        self.benchmark()
+
+    def test_query_regression(self):
+        """Рост числа запросов считается регрессией."""
+        self.benchmark(save_baseline=True)
+        with open(self.baseline) as f:
+            report = json.load(f)
+        report['scenarios']['recipes_detail[small]'].update(queries=0, p95_ms=1e6)
+        with open(self.baseline, 'w') as f:
+            json.dump(report, f)
+
+        with self.assertRaisesMessage(CommandError, 'recipes_detail[small]'):
+            self.benchmark(tolerance=1e9)
+
+    def test_no_data(self):
+        """Без данных seed_data замер невозможен."""
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            call_command('benchmark', prefix='missing', stdout=StringIO())
+
+
+class BenchmarkAsgiCommandTest(TransactionTestCase):
+    """Тестирование сравнения маршрутов под ASGI.
+
+    Каждый запрос ASGI выполняется в своем потоке со своим соединением,
+    поэтому данные должны быть зафиксированы в БД.
+    """
+
+    def test_compare_routes(self):
+        """Для каждого маршрута выводятся синхронный и асинхронный замеры без ошибок."""
+        call_command('seed_data', users=2, max_recipes=5, tags=5, ingredients=5, stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark_asgi', concurrency=2, requests=4, stdout=out)
+
+        rows = {
+            ' '.join(line.split()[:2]): line.split()[-1]  # маршрут: число ошибок
+            for line in out.getvalue().splitlines() if 'sync)' in line
+        }
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows['recipes_detail (async)'], '0')
+        self.assertEqual(set(rows.values()), {'0'})
+
+    def test_break_connections(self):
+        """После разрыва простаивающих соединений запросы проходят без ошибок."""
+        call_command('seed_data', users=1, max_recipes=3, tags=3, ingredients=3, stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark_asgi', concurrency=2, requests=4, endpoint=['tags_list'], break_connections=True,
+                     stdout=out)
+
+        self.assertIn('разорвано соединений', out.getvalue())
+
+    def test_no_data(self):
+        """Без данных seed_data замер невозможен."""
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            call_command('benchmark_asgi', prefix='missing', stdout=StringIO())
@@ -0,0 +1,104 @@
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.db import OperationalError, connection
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from core import metrics
+from core.db.base import DatabaseWrapper
+
+from .test_base import BaseTestCase
+from .test_metrics import sample
+
+
+HAS_POOL = is_psycopg3 and find_spec('psycopg_pool') is not None
+
+
+def acquired(source, alias='default'):
+    text = metrics.generate_latest()
+    return sample(text, f'db_connection_acquire_seconds_count{{alias="{alias}",source="{source}"}}') or 0
+
+
+def errors(source, alias):
+    text = metrics.generate_latest()
+    return sample(text, f'db_connection_errors_total{{alias="{alias}",source="{source}"}}') or 0
+
+
+def backend_pid(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+class DatabaseWrapperTest(BaseTestCase):
+    """Тестирование учета получения соединений."""
+
+    def test_connect_metrics(self):
+        """Новое соединение учитывается в гистограмме."""
+        before = acquired('connect')
+        copy = connection.copy()
+        try:
+            copy.ensure_connection()
+        finally:
+            copy.close()
+
+        self.assertEqual(acquired('connect'), before + 1)
+
+
+@skipUnless(HAS_POOL, 'нужен psycopg[pool]')
+class ConnectionPoolTest(BaseTestCase):
+    """Тестирование пула psycopg 3 с проверкой соединений.
+
+    Пул хранится по alias; соединение тестов пул не использует, поэтому
+    alias у них общий (contrib.postgres ищет его в connections).
+    """
+    alias = 'default'
+
+    def setUp(self):
+        self.settings = {
+            **connection.settings_dict,
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pool': {'min_size': 1, 'max_size': 1, 'timeout': 0.2}},
+        }
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        self.wrappers[0].close_pool()
+
+    def wrapper(self):
+        wrapper = DatabaseWrapper(self.settings, alias=self.alias)
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_exhausted(self):
+        """Без свободного соединения запрос ждет timeout и учитывается как ошибка пула."""
+        from psycopg_pool import PoolTimeout
+
+        first, second = self.wrapper(), self.wrapper()
+        first.ensure_connection()
+        before = errors('pool', self.alias)
+
+        with self.assertRaises(OperationalError) as ctx:
+            second.ensure_connection()
+
+        self.assertIsInstance(ctx.exception.__cause__, PoolTimeout)
+        self.assertEqual(errors('pool', self.alias), before + 1)
+
+        first.close()  # соединение возвращается в пул
+        second.ensure_connection()
+
+    def test_broken_connection_replaced(self):
+        """Разорванное соединение отбрасывается при выдаче, запрос получает новое."""
+        wrapper = self.wrapper()
+        pid = backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        new_pid = backend_pid(wrapper)
+
+        self.assertNotEqual(new_pid, pid)
+        self.assertEqual(wrapper.pool.get_stats().get('connections_lost'), 1)
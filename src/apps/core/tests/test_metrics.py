@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import re
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+from .test_base import BaseTestCase
+
+
+METRICS_URL = reverse('metrics')
+
+EXAMPLE_COUNTER = metrics.Counter('test_events_total', 'Тестовый счетчик.', ('kind',))
+EXAMPLE_HISTOGRAM = metrics.Histogram('test_duration_seconds', 'Тестовая гистограмма.', ('kind',), buckets=(1, 5))
+
+
+def sample(text, line):
+    """Значение строки метрики из текста или None."""
+    match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def increment_in_child(directory):
+    with override_settings(METRICS_DIR=directory):
+        EXAMPLE_COUNTER.labels('child').inc(2)
+        EXAMPLE_HISTOGRAM.labels('child').observe(3)
+
+
+class MetricsTest(BaseTestCase):
+    """Тестирование реестра метрик и их вывода."""
+
+    def test_exposition(self):
+        """Счетчики и накопленные корзины гистограмм в формате Prometheus."""
+        before = sample(metrics.generate_latest(), 'test_events_total{kind="a"}') or 0
+        EXAMPLE_COUNTER.labels('a').inc()
+        EXAMPLE_COUNTER.labels('a').inc(2)
+        EXAMPLE_HISTOGRAM.labels('fmt"q').observe(0.5)
+        EXAMPLE_HISTOGRAM.labels('fmt"q').observe(7)
+
+        text = metrics.generate_latest()
+
+        self.assertIn('# TYPE test_events_total counter', text)
+        self.assertEqual(sample(text, 'test_events_total{kind="a"}'), before + 3)
+        self.assertEqual(sample(text, 'test_duration_seconds_bucket{kind="fmt\\"q",le="1.0"}'), 1)
+        self.assertEqual(sample(text, 'test_duration_seconds_bucket{kind="fmt\\"q",le="5.0"}'), 1)
+        self.assertEqual(sample(text, 'test_duration_seconds_bucket{kind="fmt\\"q",le="+Inf"}'), 2)
+        self.assertEqual(sample(text, 'test_duration_seconds_count{kind="fmt\\"q"}'), 2)
+        self.assertEqual(sample(text, 'test_duration_seconds_sum{kind="fmt\\"q"}'), 7.5)
+
+    def test_multiprocess(self):
+        """Значения процессов из METRICS_DIR суммируются."""
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            EXAMPLE_COUNTER.labels('child').inc()
+            context = multiprocessing.get_context('fork')
+            for _ in range(3):
+                process = context.Process(target=increment_in_child, args=(directory,))
+                process.start()
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+
+            text = metrics.generate_latest()
+            self.assertEqual(len(os.listdir(directory)), 4)
+
+        self.assertEqual(sample(text, 'test_events_total{kind="child"}'), 7)
+        self.assertEqual(sample(text, 'test_duration_seconds_bucket{kind="child",le="5.0"}'), 3)
+
+    def test_mmap_store_grows_and_reopens(self):
+        """Файл процесса расширяется и после повторного открытия продолжает значения."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, '1.db')
+            store = metrics.MmapStore(path)
+            for i in range(3000):
+                store.add(f'key-{i}', i)
+            store.add('key-1', 1)
+
+            reopened = metrics.MmapStore(path)
+            reopened.add('key-2999', 1)
+
+            values = dict(reopened.items())
+        self.assertEqual(len(values), 3000)
+        self.assertEqual(values['key-1'], 2)
+        self.assertEqual(values['key-2999'], 3000)
+
+
+class MetricsEndpointTest(BaseTestCase):
+    """Тестирование /metrics."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@appdev.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Суп', time_minutes=5, price=1)
+
+    def test_request_metrics(self):
+        """Запросы учитываются по viewset и действию, статусу и числу SQL-запросов."""
+        line = 'http_requests_total{view="RecipeViewSet.list",method="GET",status="200"}'
+        before = sample(self.client.get(METRICS_URL).content.decode(), line) or 0
+        self.client.get(reverse('recipe:recipe-list'))
+        self.client.get(reverse('recipe:recipe-list'))
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = res.content.decode()
+        self.assertEqual(sample(text, line), before + 2)
+        self.assertIsNotNone(sample(
+            text, 'http_request_duration_seconds_count{view="RecipeViewSet.list",method="GET"}'
+        ))
+        self.assertIsNotNone(sample(text, 'http_request_db_queries_count{view="RecipeViewSet.list"}'))
+        self.assertGreaterEqual(sample(text, 'response_cache_requests_total{result="hits"}'), 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        """С METRICS_TOKEN метрики отдаются только по токену."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
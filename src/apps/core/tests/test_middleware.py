@@ -0,0 +1,125 @@
+import re
+from itertools import count
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.timing import RequestTiming, TimedSerializerMixin, activate, deactivate
+from recipe.serializers import RecipeDetailSerializer
+
+from .test_base import BaseTestCase
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def server_timing(response):
+    """Разбор Server-Timing в {метрика: (dur, desc)}."""
+    metrics = {}
+    for item in response['Server-Timing'].split(', '):
+        name, *params = item.split(';')
+        values = dict(re.match(r'(\w+)=(.*)', param).groups() for param in params)
+        metrics[name] = (float(values['dur']), values.get('desc', '').strip('"'))
+    return metrics
+
+
+class RequestTimingMiddlewareTest(BaseTestCase):
+    """Тестирование замеров времени и числа запросов."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@appdev.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Веган')
+        for i in range(3):
+            self.recipe = Recipe.objects.create(user=self.user, title=f'Суп {i}', time_minutes=5, price=1)
+            self.recipe.tags.add(tag)
+
+    def test_server_timing(self):
+        """Заголовок содержит число запросов и время БД, сериализации и обработки."""
+        # Список сериализуется из строк за микросекунды, заметное время дает сериализатор DRF
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+
+        metrics = server_timing(res)
+        self.assertEqual(set(metrics), {'db', 'serializer', 'view'})
+        self.assertEqual(metrics['db'][1], f'{len(ctx.captured_queries)} queries')
+        self.assertGreater(metrics['serializer'][0], 0)
+        self.assertGreaterEqual(metrics['view'][0], metrics['db'][0] + metrics['serializer'][0])
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_disabled(self):
+        """Заголовок можно отключить."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(REQUEST_TIMING_SQL_SAMPLE_RATE=0)
+    def test_log_line(self):
+        """Строка лога с именем viewset и действия, без текста SQL вне выборки."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+            self.client.get(reverse('recipe:tag-suggest'), {'q': 'ве'})
+
+        list_record, suggest_record = logs.records
+        self.assertIn('view=RecipeViewSet.list method=GET', list_record.getMessage())
+        self.assertEqual(list_record.timing['status'], 200)
+        self.assertGreater(list_record.timing['queries'], 0)
+        self.assertNotIn('sql', list_record.timing)
+        self.assertEqual(suggest_record.timing['view'], 'TagViewSet.suggest')
+
+    @override_settings(REQUEST_TIMING_SQL_SAMPLE_RATE=1)
+    def test_sampled_sql(self):
+        """В выборку попадает полный текст SQL."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        record = logs.records[0]
+        self.assertEqual(len(record.timing['sql']), record.timing['queries'])
+        self.assertTrue(any('core_recipe' in sql for sql in record.timing['sql']))
+
+    async def test_async_view(self):
+        """Асинхронный обработчик учитывается так же: запросы из sync_to_async, имя класса."""
+        token = await Token.objects.acreate(user=self.user)
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            res = await AsyncClient().get(
+                reverse('recipe:async-recipe-list'), headers={'Authorization': f'Token {token.key}'}
+            )
+
+        record = logs.records[0]
+        self.assertEqual(record.timing['view'], 'AsyncRecipeView.get')
+        self.assertGreater(record.timing['queries'], 0)
+        self.assertEqual(server_timing(res)['db'][1], f"{record.timing['queries']} queries")
+
+
+class TimedSerializerMixinTest(BaseTestCase):
+    """Тестирование учета времени сериализации."""
+
+    def test_nested_counted_once(self):
+        """Вложенные сериализаторы не удваивают время, запросы к БД вычитаются."""
+        user = get_user_model().objects.create_user('test@appdev.com', 'testpass')
+        recipe = Recipe.objects.create(user=user, title='Суп', time_minutes=5, price=1)
+        recipe.tags.add(Tag.objects.create(user=user, name='Веган'))
+        self.assertTrue(issubclass(RecipeDetailSerializer, TimedSerializerMixin))
+
+        timing = RequestTiming()
+        token = activate(timing)
+        try:
+            # Часы идут на единицу за вызов: сериализация 0..5, запросы 1..2 и 3..4
+            with patch('core.timing.time') as clock:
+                clock.perf_counter.side_effect = count()
+                RecipeDetailSerializer(recipe).data  # теги и ингредиенты загружаются лениво
+        finally:
+            deactivate(token)
+
+        self.assertEqual(timing.depth, 0)
+        self.assertEqual(timing.queries, 2)
+        self.assertEqual(timing.db, 2)
+        self.assertEqual(timing.serializer, 3)
@@ -1,5 +1,6 @@
 from unittest.mock import patch
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 
 from core import models
 from .test_base import BaseTestCase
@@ -77,6 +78,45 @@ class ModelTests(BaseTestCase):
 
         self.assertEqual(str(recipe), recipe.title)
 
+    def test_recipe_version_increments(self):
+        """Тестирование роста версии рецепта при изменениях."""
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Омлет',
+            time_minutes=5,
+            price=2.00
+        )
+        recipe.title = 'Омлет с сыром'
+        recipe.save()
+        self.assertEqual(recipe.version, 2)
+
+        recipe.tags.add(models.Tag.objects.create(user=user, name='Завтрак'))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 3)
+
+    def test_tag_name_unique_case_insensitive(self):
+        """Тестирование уникальности имени тега без учета регистра."""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Веган')
+        models.Tag.objects.create(user=sample_user('other@appdev.com'), name='веган')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='ВЕГАН')
+
+    def test_get_or_create_many(self):
+        """Тестирование пакетного поиска или создания ингредиентов."""
+        user = sample_user()
+        salt = models.Ingredient.objects.create(user=user, name='Соль')
+
+        rows = models.Ingredient.objects.get_or_create_many(user, ['Сахар', 'соль', 'сахар', 'Перец'])
+
+        self.assertEqual([(name, created) for _, name, created in rows], [
+            ('Сахар', True), ('Соль', False), ('Перец', True),
+        ])
+        self.assertEqual(rows[1][0], salt.id)
+        self.assertEqual(models.Ingredient.objects.filter(user=user).count(), 3)
+
     @patch('uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Тестирование генерации имени файла в корректной директории."""
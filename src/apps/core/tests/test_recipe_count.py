@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from core.models import Ingredient, Recipe, Tag
+from .test_base import BaseTestCase
+
+
+User = get_user_model()
+
+
+class RecipeCountTests(BaseTestCase):
+    """Тестирование счетчиков recipe_count у тегов и ингредиентов."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ('Завтрак', 'Обед', 'Ужин')]
+        self.recipes = [
+            Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=1)
+            for title in ('Блины', 'Суп')
+        ]
+
+    def assertCounts(self, *expected):
+        counts = [Tag.objects.get(pk=tag.pk).recipe_count for tag in self.tags]
+        self.assertEqual(counts, list(expected))
+
+    def test_add_and_remove(self):
+        """Тестирование добавления и удаления связей со стороны рецепта."""
+        first, second = self.recipes
+        first.tags.add(self.tags[0], self.tags[1])
+        first.tags.add(self.tags[0])  # уже связан
+        second.tags.add(self.tags[0])
+        self.assertCounts(2, 1, 0)
+
+        first.tags.remove(self.tags[0], self.tags[2])  # второй не связан
+        self.assertCounts(1, 1, 0)
+
+        second.tags.set([self.tags[1], self.tags[2]])
+        self.assertCounts(0, 2, 1)
+
+        second.tags.clear()
+        self.assertCounts(0, 1, 0)
+
+    def test_reverse_side(self):
+        """Тестирование изменения связей со стороны тега."""
+        tag = self.tags[0]
+        tag.recipe_set.add(*self.recipes)
+        self.assertCounts(2, 0, 0)
+
+        tag.recipe_set.remove(self.recipes[0])
+        self.assertCounts(1, 0, 0)
+
+        tag.recipe_set.clear()
+        self.assertCounts(0, 0, 0)
+
+    def test_recipe_deleted(self):
+        """Тестирование уменьшения счетчиков при удалении рецепта."""
+        salt = Ingredient.objects.create(user=self.user, name='Соль')
+        for recipe in self.recipes:
+            recipe.tags.add(self.tags[0])
+            recipe.ingredients.add(salt)
+
+        self.recipes[0].delete()
+
+        self.assertCounts(1, 0, 0)
+        self.assertEqual(Ingredient.objects.get(pk=salt.pk).recipe_count, 1)
+
+    def test_count_not_negative(self):
+        """Тестирование нижней границы счетчика, если он уже уменьшен параллельным удалением."""
+        salt = Ingredient.objects.create(user=self.user, name='Соль')
+        for recipe in self.recipes:
+            recipe.tags.add(self.tags[0])
+            recipe.ingredients.add(salt)
+        Tag.objects.update(recipe_count=0)
+        Ingredient.objects.update(recipe_count=0)
+
+        self.recipes[0].tags.remove(self.tags[0])
+        self.recipes[1].delete()
+
+        self.assertCounts(0, 0, 0)
+        self.assertEqual(Ingredient.objects.get(pk=salt.pk).recipe_count, 0)
+
+    def test_recount_command(self):
+        """Тестирование команды пересчета с отчетом о расхождениях."""
+        self.recipes[0].tags.add(self.tags[0])
+        Tag.objects.filter(pk=self.tags[1].pk).update(recipe_count=5)
+
+        with self.assertRaises(CommandError):
+            call_command('recount_recipes', '--check', stdout=StringIO())
+        self.assertCounts(1, 5, 0)
+
+        out = StringIO()
+        call_command('recount_recipes', stdout=out)
+
+        self.assertIn(f'id={self.tags[1].pk}: 5 вместо 0', out.getvalue())
+        self.assertCounts(1, 0, 0)
+        call_command('recount_recipes', '--check', stdout=StringIO())
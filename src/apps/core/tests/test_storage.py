@@ -0,0 +1,83 @@
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage
+
+
+class StorageMixin:
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+
+class ContentAddressedStorageTests(StorageMixin, TestCase):
+    """Тестирование хранилища по хэшу содержимого."""
+
+    def test_name_from_content(self):
+        """Тестирование имени файла по хэшу с вложенными каталогами."""
+        name = self.storage.save('uploads/recipe/photo.JPG', ContentFile(b'image'))
+
+        self.assertRegex(name, r'^uploads/recipe/([0-9a-f]{2})/([0-9a-f]{2})/[0-9a-f]{64}\.jpg$')
+        shard1, shard2, digest = re.match(r'uploads/recipe/(..)/(..)/(\w+)', name).groups()
+        self.assertEqual(digest[:4], shard1 + shard2)
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'image')
+        self.assertEqual(os.listdir(os.path.join(self.location, '.tmp')), [])
+
+    def test_duplicates_share_copy(self):
+        """Тестирование одной копии для одинаковых файлов."""
+        first = self.storage.save('uploads/recipe/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('uploads/recipe/b.jpg', ContentFile(b'same'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(StoredFile.objects.get(name=first).refcount, 2)
+
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+
+        self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertFalse(StoredFile.objects.filter(name=first).exists())
+
+    def test_delete_file_without_counter(self):
+        """Тестирование удаления файла, сохраненного до хранилища по хэшу."""
+        path = os.path.join(self.location, 'uploads/recipe/old.jpg')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'old')
+
+        self.storage.delete('uploads/recipe/old.jpg')
+
+        self.assertFalse(os.path.exists(path))
+
+
+class ContentAddressedStorageConcurrencyTests(StorageMixin, TransactionTestCase):
+    """Тестирование параллельной загрузки одинаковых файлов."""
+
+    def test_concurrent_saves(self):
+        """Тестирование счетчика ссылок при параллельных загрузках."""
+        def save(i):
+            try:
+                return self.storage.save(f'uploads/recipe/{i}.jpg', ContentFile(b'photo' * 1000))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            names = set(executor.map(save, range(16)))
+
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 16)
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'photo' * 1000)
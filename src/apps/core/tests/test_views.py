@@ -0,0 +1,204 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import Mock, patch
+
+from django.db import OperationalError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.health import health_cache
+
+from .test_base import BaseTestCase
+
+
+HASHED = 'uploads/recipe/ab/cd/' + 'abcd' * 16 + '.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+class ServeMediaTests(BaseTestCase):
+    """Тестирование отдачи медиафайлов без прокси."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        for name in ('uploads/recipe/photo.jpg', HASHED, '.uploads/secret.part'):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root)
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('media', args=[name]), headers=headers)
+
+    def test_full_file(self):
+        """Тест отдачи файла целиком."""
+        res = self.get('uploads/recipe/photo.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=3600', res['Cache-Control'])
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_content_addressed_immutable(self):
+        """Тест бессрочного кэширования файлов по хэшу."""
+        res = self.get(HASHED)
+
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('max-age=31536000', res['Cache-Control'])
+
+    def test_range(self):
+        """Тест отдачи диапазона байт."""
+        res = self.get('uploads/recipe/photo.jpg', Range='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+        res = self.get('uploads/recipe/photo.jpg', Range='bytes=-5')
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+        res = self.get('uploads/recipe/photo.jpg', Range='bytes=1000-')
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[1000:])
+
+    def test_range_not_satisfiable(self):
+        """Тест диапазона за пределами файла."""
+        res = self.get('uploads/recipe/photo.jpg', Range=f'bytes={len(CONTENT)}-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_invalid_range_ignored(self):
+        """Тест отдачи файла целиком при неверном заголовке Range."""
+        for header in ('bytes=500-100', 'bytes=abc', 'items=0-9'):
+            with self.subTest(header=header):
+                res = self.get('uploads/recipe/photo.jpg', Range=header)
+
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_if_range_mismatch_returns_full_file(self):
+        """Тест отдачи файла целиком, если он изменился после If-Range."""
+        res = self.get('uploads/recipe/photo.jpg', Range='bytes=0-9', **{'If-Range': '"old"'})
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_conditional(self):
+        """Тест ответа 304 по If-None-Match и If-Modified-Since."""
+        first = self.get('uploads/recipe/photo.jpg')
+
+        res = self.get('uploads/recipe/photo.jpg', **{'If-None-Match': first['ETag']})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], first['ETag'])
+
+        res = self.get('uploads/recipe/photo.jpg', **{'If-Modified-Since': first['Last-Modified']})
+        self.assertEqual(res.status_code, 304)
+
+        res = self.get('uploads/recipe/photo.jpg', **{'If-Modified-Since': http_date(0)})
+        self.assertEqual(res.status_code, 200)
+
+    def test_hidden_and_missing_not_found(self):
+        """Тест недоступности служебных, отсутствующих файлов и выхода за MEDIA_ROOT."""
+        for name in ('.uploads/secret.part', 'uploads/recipe/missing.jpg', 'uploads/recipe', '../etc/passwd'):
+            self.assertEqual(self.get(name).status_code, 404, name)
+
+    def test_post_not_allowed(self):
+        """Тест запрета изменяющих методов."""
+        res = self.client.post(reverse('media', args=['uploads/recipe/photo.jpg']))
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """Тест передачи отдачи файла nginx."""
+        res = self.get(HASHED)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Accel-Redirect'], '/protected-media/' + HASHED)
+        self.assertEqual(res.content, b'')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_x_sendfile(self):
+        """Тест передачи отдачи файла Apache."""
+        res = self.get('uploads/recipe/photo.jpg')
+
+        self.assertEqual(res['X-Sendfile'], os.path.join(self.media_root, 'uploads/recipe/photo.jpg'))
+
+
+class HealthCheckTests(BaseTestCase):
+    """Тестирование /healthz и /readyz."""
+
+    def setUp(self):
+        health_cache.clear()
+        self.addCleanup(health_cache.clear)
+
+    def test_ready(self):
+        """Тест проверки настоящим запросом к БД."""
+        res = self.client.get(reverse('readyz'))
+        live = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['status'], 'ok')
+        self.assertGreaterEqual(res.json()['database']['latency_ms'], 0)
+        self.assertIn('no-store', res['Cache-Control'])
+        self.assertEqual(live.status_code, 200)
+
+    @patch('core.health.ping_database', return_value=0.001)
+    def test_cached(self, ping):
+        """Тест кэширования: пробы в пределах HEALTH_CHECK_TTL не обращаются к БД."""
+        for _ in range(3):
+            self.client.get(reverse('readyz'))
+            self.client.get(reverse('healthz'))
+        self.assertEqual(ping.call_count, 1)
+
+        with override_settings(HEALTH_CHECK_TTL=0):
+            health_cache.clear()
+            self.client.get(reverse('readyz'))
+            self.client.get(reverse('readyz'))
+        self.assertEqual(ping.call_count, 3)
+
+    @patch('core.health.ping_database', side_effect=OperationalError('connection refused'))
+    def test_database_unavailable(self, ping):
+        """Тест недоступной БД: не готов, но жив."""
+        with self.assertLogs('core.health', 'WARNING'):
+            res = self.client.get(reverse('readyz'))
+        live = self.client.get(reverse('healthz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable', 'database': {}, 'reason': 'database unavailable'})
+        self.assertEqual(live.status_code, 200)
+        self.assertEqual(live.json()['status'], 'unavailable')
+
+    @override_settings(HEALTH_DB_LATENCY_LIMIT=0.1)
+    @patch('core.health.ping_database', return_value=0.25)
+    def test_database_slow(self, ping):
+        """Тест медленной БД."""
+        res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['reason'], 'database slow')
+        self.assertEqual(res.json()['database']['latency_ms'], 250)
+
+    @override_settings(HEALTH_POOL_MAX_WAITING=2)
+    @patch('core.health.ping_database')
+    def test_pool_saturated(self, ping):
+        """Тест переполненной очереди пула: БД не проверяется, процесс не готов."""
+        stats = {'pool_size': 4, 'pool_available': 0, 'pool_max': 4, 'requests_waiting': 3}
+        pooled = Mock(pool=Mock(get_stats=Mock(return_value=stats)))
+        with patch('core.health.connections', {'default': pooled}):
+            res = self.client.get(reverse('readyz'))
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['pool'], {'size': 4, 'available': 0, 'max': 4, 'waiting': 3})
+        self.assertEqual(res.json()['reason'], 'pool saturated')
+        ping.assert_not_called()
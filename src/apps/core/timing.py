@@ -0,0 +1,88 @@
+import contextvars
+import time
+
+
+SQL_SAMPLE_LIMIT = 100  # запросов с текстом в одной выборке
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Счетчики одного запроса: SQL-запросы, время БД и сериализации.
+
+    Запросы к БД передает execute_wrapper, на каждый запрос уходит только
+    два вызова perf_counter.
+    """
+    __slots__ = ('queries', 'db', 'serializer', 'depth', 'sql')
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.depth = 0
+        self.sql = [] if capture_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+            if self.sql is not None and len(self.sql) < SQL_SAMPLE_LIMIT:
+                self.sql.append(sql)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Передает запрос к БД счетчикам текущего контекста.
+
+    Подключается к каждому соединению при его создании, а не на время
+    запроса: соединения привязаны к потоку, и запросы асинхронного
+    обработчика выполняются в потоке sync_to_async, куда переходит
+    контекст, но не обертки, подключенные из цикла событий.
+    """
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(connection, **kwargs):
+    """Обработчик connection_created."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def current_timing():
+    """Счетчики текущего запроса или None вне RequestTimingMiddleware."""
+    return _current.get()
+
+
+def activate(timing):
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class TimedSerializerMixin:
+    """Учитывает время to_representation во времени сериализации запроса.
+
+    Измеряется только внешний вызов: вложенные сериализаторы и элементы
+    списка не считаются дважды. Запросы к БД, выполненные во время
+    сериализации (ленивые связи), вычитаются - они уже учтены в db.
+    """
+
+    def to_representation(self, instance):
+        timing = _current.get()
+        if timing is None or timing.depth:
+            return super().to_representation(instance)
+
+        timing.depth += 1
+        start, db = time.perf_counter(), timing.db
+        try:
+            return super().to_representation(instance)
+        finally:
+            timing.depth -= 1
+            timing.serializer += time.perf_counter() - start - (timing.db - db)
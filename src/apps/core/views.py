@@ -0,0 +1,161 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from core.health import check_database
+from core.metrics import CONTENT_TYPE, generate_latest
+from core.storage import is_content_addressed
+
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдает файл из MEDIA_ROOT с поддержкой Range и условных запросов.
+
+    Файлы с именем по хэшу содержимого кэшируются клиентом бессрочно.
+    При MEDIA_ACCEL сама передача отдается прокси через X-Accel-Redirect
+    или X-Sendfile, а Django только проверяет путь и ставит заголовки.
+    """
+    # Служебные каталоги (.tmp, .uploads) и выход за MEDIA_ROOT не отдаются
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, full_path, path, stat.st_size, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def _file_response(request, full_path, path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        return response
+    if settings.MEDIA_ACCEL == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = _requested_range(request, size, etag, last_modified)
+    if byte_range is None:
+        # Сервер приложений может передать файл через wsgi.file_wrapper (sendfile)
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    elif byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _requested_range(request, size, etag, last_modified):
+    """Диапазон (start, end) из заголовка Range.
+
+    None - отдать файл целиком (нет Range, он неверный, несколько диапазонов
+    или If-Range не совпал), False - диапазон за пределами файла.
+    """
+    header = request.headers.get('Range')
+    if not header:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        if last and int(last) < int(first):
+            return None  # синтаксически неверный диапазон игнорируется (RFC 9110, 14.1.1)
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1  # последние N байт
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+@require_safe
+def metrics(request):
+    """Метрики в текстовом формате Prometheus.
+
+    При заданном METRICS_TOKEN требуется заголовок Authorization: Bearer <токен>.
+    """
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if settings.METRICS_TOKEN and not constant_time_compare(request.headers.get('Authorization', ''), expected):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE)
+
+
+@require_safe
+def healthz(request):
+    """Проба живости: процесс отвечает на запросы.
+
+    Ответ всегда 200, состояние БД в теле только для информации:
+    недоступная БД не повод перезапускать процесс.
+    """
+    return _health_response(check_database(), status=200)
+
+
+@require_safe
+def readyz(request):
+    """Проба готовности: процесс может обслуживать запросы.
+
+    Ответ 503, если БД недоступна, отвечает дольше HEALTH_DB_LATENCY_LIMIT
+    или очередь пула длиннее HEALTH_POOL_MAX_WAITING.
+    """
+    result = check_database()
+    return _health_response(result, status=200 if result['status'] == 'ok' else 503)
+
+
+def _health_response(result, status):
+    response = JsonResponse(result, status=status)
+    patch_cache_control(response, no_store=True)
+    return response
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from core.authentication import AsyncCachedTokenAuthentication
+from recipe import views
+from recipe.cache import aresponse_cache_key, count_cache_result, list_etag, response_cache
+
+
+class AsyncReadOnlyView(View):
+    """Асинхронные list и retrieve поверх синхронного viewset.
+
+    Запрос к БД, сортировка, пагинация и сериализатор берутся у
+    viewset_class, здесь асинхронно только получение данных: токен, кэш
+    ответов и ORM (aget, aiterator с prefetch). Под ASGI обработчик не
+    занимает поток на весь запрос. Ответ всегда JSON.
+    """
+    viewset_class = None
+    basename = None  # отдельный ключ кэша: ссылки пагинации ведут на асинхронный маршрут
+    http_method_names = ['get', 'head', 'options']
+    authenticator = AsyncCachedTokenAuthentication()
+    renderer = JSONRenderer()
+
+    async def get(self, request, pk=None):
+        drf_request = Request(request)
+        drf_request.accepted_renderer = self.renderer
+        drf_request.accepted_media_type = self.renderer.media_type
+        viewset = self.viewset_class(
+            request=drf_request, args=(), kwargs=self.kwargs, format_kwarg=None,
+            action='list' if pk is None else 'retrieve', basename=self.basename,
+        )
+        try:
+            await self.authenticate(drf_request)
+            if pk is None:
+                return await self.list(viewset, drf_request)
+            return await self.retrieve(viewset, drf_request)
+        except Exception as exc:
+            return self.handle_exception(viewset, exc)
+
+    async def authenticate(self, request):
+        """Аналог IsAuthenticated с CachedTokenAuthentication."""
+        result = await self.authenticator.aauthenticate(request._request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+
+    async def list(self, viewset, request):
+        cache = response_cache()
+        key = await aresponse_cache_key(viewset, request)
+        etag = list_etag(key, request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        data = await cache.aget(key)
+        if data is not None:
+            count_cache_result('hits')
+            response = self.render(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            count_cache_result('misses')
+            data = await self.get_page(viewset, request)
+            await cache.aset(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+            response = self.render(data)
+            response['X-Cache'] = 'MISS'
+
+        response['ETag'] = etag
+        return response
+
+    async def get_page(self, viewset, request):
+        """Страница как у ListModelMixin.list, строки читаются через aiterator."""
+        paginator = viewset.paginator
+        queryset = paginator.get_page_queryset(viewset.filter_queryset(viewset.get_queryset()), request, viewset)
+        # Размер пачки равен выборке: запрос страницы и prefetch связей выполняются по одному разу
+        results = [obj async for obj in queryset.aiterator(chunk_size=paginator.page_size + 1)]
+        serializer = viewset.get_serializer(paginator.get_page(results), many=True)
+        if hasattr(serializer, 'aload_links'):
+            await serializer.aload_links()  # сериализатор строк values() сам читает связи
+        return paginator.get_paginated_response(serializer.data).data
+
+    async def retrieve(self, viewset, request):
+        return self.render(viewset.get_serializer(await self.get_object(viewset)).data)
+
+    async def get_object(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        try:
+            return await queryset.aget(pk=self.kwargs['pk'])
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')  # как get_object_or_404
+
+    def render(self, data, status=200, headers=None):
+        return HttpResponse(
+            self.renderer.render(data), status=status, headers=headers,
+            content_type=f'{self.renderer.media_type}; charset={self.renderer.charset}',
+        )
+
+    def handle_exception(self, viewset, exc):
+        """Ошибки в том же виде, что и у APIView.handle_exception."""
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authenticator.authenticate_header(viewset.request)
+            exc.status_code = 401
+
+        response = exception_handler(exc, viewset.get_exception_handler_context())
+        if response is None:
+            raise exc
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'}  # WWW-Authenticate
+        return self.render(response.data, status=response.status_code, headers=headers)
+
+
+class AsyncTagView(AsyncReadOnlyView):
+    viewset_class = views.TagViewSet
+    basename = 'async-tag'
+
+
+class AsyncIngredientView(AsyncReadOnlyView):
+    viewset_class = views.IngredientViewSet
+    basename = 'async-ingredient'
+
+
+class AsyncRecipeView(AsyncReadOnlyView):
+    viewset_class = views.RecipeViewSet
+    basename = 'async-recipe'
+
+    async def retrieve(self, viewset, request):
+        """Как RecipeViewSet.retrieve: ETag, Last-Modified и 304 без загрузки рецепта."""
+        if 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers:
+            state = await viewset._recipe_state_queryset().afirst()
+            if state is None:
+                raise Http404
+            etag, last_modified = viewset._validators(state)
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+
+        instance = await self.get_object(viewset)
+        response = self.render(viewset.get_serializer(instance).data)
+        return viewset._with_validators(response, {
+            'id': instance.id, 'version': instance.version, 'updated_at': instance.updated_at,
+        })
@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from core.metrics import RESPONSE_CACHE
+
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_user_version(user_id):
+    """Возвращает текущую версию данных пользователя."""
+    cache = response_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Начальное значение от времени: после вытеснения ключа версия не
+        # вернется к уже использованному значению и старые записи не оживут
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+async def aget_user_version(user_id):
+    """get_user_version для асинхронных обработчиков."""
+    cache = response_cache()
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        await cache.aadd(_version_key(user_id), time.time_ns(), timeout=None)
+        version = await cache.aget(_version_key(user_id))
+    return version
+
+
+def _bump(user_id):
+    cache = response_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:  # ключа нет: следующее чтение создаст новую версию
+        pass
+
+
+def bump_user_version(user_id):
+    """Инвалидирует все закэшированные ответы пользователя.
+
+    Версия увеличивается сразу и еще раз после фиксации транзакции: иначе
+    запрос, прочитавший новую версию до коммита, закэшировал бы старые данные.
+    """
+    _bump(user_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(user_id))
+
+
+def _normalize(name, value):
+    """Приводит параметр к каноническому виду, чтобы равные запросы давали один ключ."""
+    if name in ('tags', 'ingredients'):
+        try:
+            return ','.join(str(i) for i in sorted({int(v) for v in value.split(',')}))
+        except ValueError:
+            return value
+    if name == 'assigned_only':
+        try:
+            return str(int(bool(int(value))))
+        except ValueError:
+            return value
+    return value
+
+
+def _params_digest(request):
+    params = sorted(
+        (name, _normalize(name, value))
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    raw = f'{request.get_host()}|{params!r}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def response_cache_key(view, request):
+    """Ключ: пользователь, версия его данных и нормализованные параметры запроса."""
+    user_id = request.user.pk
+    return f'recipe:list:{view.basename}:{user_id}:{get_user_version(user_id)}:{_params_digest(request)}'
+
+
+async def aresponse_cache_key(view, request):
+    """response_cache_key для асинхронных обработчиков."""
+    user_id = request.user.pk
+    return f'recipe:list:{view.basename}:{user_id}:{await aget_user_version(user_id)}:{_params_digest(request)}'
+
+
+def count_cache_result(result):
+    """Учитывает обращение к кэшу ответов: result - 'hits' или 'misses'."""
+    with _stats_lock:
+        _stats[result] += 1
+    RESPONSE_CACHE.labels(result).inc()
+
+
+def cache_stats():
+    """Счетчики попаданий и промахов кэша ответов в этом процессе."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def list_etag(cache_key, request):
+    """ETag списка: меняется вместе с версией данных пользователя и форматом ответа."""
+    raw = f'{cache_key}|{request.accepted_renderer.format}'
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+class CachedListMixin:
+    """Отдает list из кэша ответов, пока данные пользователя не изменились.
+
+    На If-None-Match с текущим ETag отвечает 304 без обращения к БД.
+    """
+
+    def list(self, request, *args, **kwargs):
+        cache = response_cache()
+        key = response_cache_key(self, request)
+        etag = list_etag(key, request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        data = cache.get(key)
+        if data is not None:
+            count_cache_result('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            count_cache_result('misses')
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from itertools import islice
+
+from core.models import Recipe
+
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+EXPORT_COLUMNS = EXPORT_FIELDS + ('tags', 'ingredients')  # ключи строк iter_recipes
+BUFFER_SIZE = 64 * 1024  # байт в одном куске ответа
+
+
+def iter_recipes(queryset, chunk_size):
+    """Рецепты словарями с именами тегов и ингредиентов.
+
+    Рецепты читаются серверным курсором по chunk_size строк, связи
+    подгружаются двумя запросами на каждую порцию, поэтому в памяти
+    никогда не больше одной порции, каким бы большим ни был аккаунт.
+    """
+    rows = queryset.order_by('id').values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        recipe_ids = [row['id'] for row in chunk]
+        tags = _names(Recipe.tags.through, 'tag', recipe_ids)
+        ingredients = _names(Recipe.ingredients.through, 'ingredient', recipe_ids)
+        for row in chunk:
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+            yield row
+
+
+def _names(through, field, recipe_ids):
+    """{id рецепта: [имена]} одной выборкой по связующей таблице."""
+    names = defaultdict(list)
+    links = through.objects.filter(recipe_id__in=recipe_ids).order_by('recipe_id', f'{field}__name')
+    for recipe_id, name in links.values_list('recipe_id', f'{field}__name'):
+        names[recipe_id].append(name)
+    return names
+
+
+def buffered(pieces, charset='utf-8', size=BUFFER_SIZE):
+    """Склеивает мелкие строки в куски около size байт для отправки клиенту."""
+    buffer, length = [], 0
+    for piece in pieces:
+        data = piece.encode(charset)
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def accepts_gzip(header):
+    """Разрешает ли Accept-Encoding ответ в gzip с учетом q (gzip;q=0 - отказ)."""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    return weights.get('gzip', weights.get('*', 0.0)) > 0
@@ -0,0 +1,125 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.metrics import IMAGE_BYTES
+from core.models import RECIPE_IMAGE_DIR, Recipe
+from recipe.cache import bump_user_version
+
+
+logger = logging.getLogger(__name__)
+
+# Параметры кодирования производных; EXIF не передается, поэтому в файлы он не попадает
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+
+_executor = None
+
+
+def _submit(func, *args):
+    """Ставит задачу в общий пул с фиксированным числом потоков."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS, thread_name_prefix='recipe-images'
+        )
+    return _executor.submit(_run_in_worker, func, *args)
+
+
+def _run_in_worker(func, *args):
+    """Выполняет задачу со своим соединением с БД, как обработчик запроса."""
+    close_old_connections()
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', func.__name__)
+    finally:
+        close_old_connections()
+
+
+def schedule_derivatives(recipe):
+    """Запускает построение производных после фиксации транзакции с новым изображением."""
+    recipe_id, name = recipe.pk, recipe.image.name
+    transaction.on_commit(lambda: _submit(generate_derivatives, recipe_id, name))
+
+
+def render_derivatives(source, sizes, formats):
+    """Строит уменьшенные копии изображения.
+
+    Возвращает {размер: {формат: байты}}. JPEG декодируется сразу в
+    уменьшенном масштабе (draft), остальное уменьшается через reduce(),
+    поэтому память ограничена размером наибольшей производной, а не оригинала.
+    """
+    largest = max(sizes.values())
+    with Image.open(source) as image:
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)  # поворот по EXIF до того, как он будет отброшен
+
+        result = {}
+        for label, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), reducing_gap=3.0)  # следующий размер строится из предыдущего
+            result[label] = {fmt: _encode(image, fmt) for fmt in formats}
+        return result
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, **SAVE_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def generate_derivatives(recipe_id, name):
+    """Строит и сохраняет производные изображения рецепта."""
+    storage = Recipe._meta.get_field('image').storage
+    try:
+        source = storage.open(name)
+    except FileNotFoundError:
+        return  # изображение заменили и удалили раньше, чем до него дошла очередь
+    with source:
+        IMAGE_BYTES.labels('original').inc(source.size)
+        rendered = render_derivatives(source, settings.RECIPE_IMAGE_SIZES, settings.RECIPE_IMAGE_FORMATS)
+    IMAGE_BYTES.labels('derivative').inc(sum(len(data) for files in rendered.values() for data in files.values()))
+
+    stem = os.path.splitext(os.path.basename(name))[0]
+    derivatives = {
+        label: {
+            fmt: storage.save(
+                os.path.join(RECIPE_IMAGE_DIR, f'{stem}_{label}.{"jpg" if fmt == "jpeg" else fmt}'),
+                ContentFile(data),
+            )
+            for fmt, data in files.items()
+        }
+        for label, files in rendered.items()
+    }
+
+    # Изображение могли заменить, пока шла обработка
+    recipes = Recipe.objects.filter(pk=recipe_id, image=name)
+    user_id = recipes.values_list('user_id', flat=True).first()
+    if user_id is not None and recipes.touch(image_derivatives=derivatives):
+        bump_user_version(user_id)
+    else:
+        _delete_files(storage, derivatives)
+
+
+def release_image(name, derivatives):
+    """Освобождает оригинал и копии изображения после фиксации транзакции."""
+    if name:
+        storage = Recipe._meta.get_field('image').storage
+        transaction.on_commit(lambda: _delete_files(storage, derivatives, name))
+
+
+def _delete_files(storage, derivatives, *names):
+    for path in [*names, *(path for files in derivatives.values() for path in files.values())]:
+        storage.delete(path)
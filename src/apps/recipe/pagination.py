@@ -0,0 +1,186 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу (сортируемое поле, id).
+
+    Курсор хранит значения ключа последнего объекта страницы, поэтому
+    следующая страница выбирается условием по индексу, а не смещением,
+    и страница N стоит столько же, сколько первая.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_param = 'ordering'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Возвращает запрос на одну страницу плюс один лишний объект."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, view)
+        self.cursor = self.decode_cursor(request, self._ordering_fields(queryset))
+
+        reverse = self.cursor is not None and self.cursor['reverse']
+        ordering = self._reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(ordering, self.cursor['position']))
+
+        return queryset[:self.page_size + 1]  # лишний объект показывает наличие следующей страницы
+
+    def get_page(self, results):
+        """Формирует страницу и позиции соседних страниц из выборки."""
+        reverse = self.cursor is not None and self.cursor['reverse']
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()  # выборка назад шла в обратном порядке
+
+        first = self._position(self.page[0]) if self.page else None
+        last = self._position(self.page[-1]) if self.page else None
+        if reverse:
+            self.next_position = last
+            self.previous_position = first if has_more else None
+        else:
+            self.next_position = last if has_more else None
+            self.previous_position = first if self.cursor is not None else None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Размер страницы из запроса, ограниченный сверху настройкой сервера."""
+        max_page_size = settings.API_MAX_PAGE_SIZE
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return min(settings.API_PAGE_SIZE, max_page_size)
+
+        if page_size <= 0:
+            raise ValidationError({self.page_size_query_param: _('Must be a positive integer.')})
+        return min(page_size, max_page_size)
+
+    def get_ordering(self, request, view):
+        """Возвращает сортировку (поле, id) с учетом параметра ordering."""
+        ordering = getattr(view, 'ordering', 'id')
+        requested = request.query_params.get(self.ordering_param)
+        if requested:
+            if requested.lstrip('-') not in getattr(view, 'ordering_fields', ()):
+                raise ValidationError({self.ordering_param: _('Unsupported ordering.')})
+            ordering = requested
+
+        field = ordering.lstrip('-')
+        if field == 'id':
+            return (ordering,)
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def decode_cursor(self, request, fields):
+        """Курсор из запроса; значения позиции приводятся к типам полей сортировки fields."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(base64.b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = data['p'], bool(data['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(fields):
+            raise NotFound(self.invalid_cursor_message)  # курсор от другой сортировки
+        try:
+            # Подделанный курсор иначе дал бы ошибку внутри ORM и ответ 500
+            position = [field.to_python(value) for field, value in zip(fields, position)]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)  # поля сортировки не бывают пустыми
+        return {'position': position, 'reverse': reverse}
+
+    def _ordering_fields(self, queryset):
+        """Поля модели или аннотации (rank поиска) для ключа сортировки."""
+        fields = []
+        for order in self.ordering:
+            name = order.lstrip('-')
+            annotation = queryset.query.annotations.get(name)
+            fields.append(annotation.output_field if annotation is not None else queryset.model._meta.get_field(name))
+        return fields
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, instance):
+        """Значения ключа сортировки для объекта (модели или словаря)."""
+        position = []
+        for order in self.ordering:
+            field = order.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            position.append(str(value) if isinstance(value, Decimal) else value)
+        return position
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return tuple(order[1:] if order.startswith('-') else '-' + order for order in ordering)
+
+    @staticmethod
+    def _after(ordering, position):
+        """Условие «ключ строго после позиции» для заданной сортировки.
+
+        Для (a, id) строится `a >= x AND (a > x OR id > y)`: первое условие
+        дает планировщику границу диапазона по составному индексу.
+        """
+        (first, *rest), (value, *rest_values) = ordering, position
+        field = first.lstrip('-')
+        op = 'lt' if first.startswith('-') else 'gt'
+        if not rest:
+            return Q(**{f'{field}__{op}': value})
+
+        tail = KeysetPagination._after(rest, rest_values)
+        return Q(**{f'{field}__{op}e': value}) & (Q(**{f'{field}__{op}': value}) | tail)
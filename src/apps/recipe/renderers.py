@@ -0,0 +1,61 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class _Echo:
+    """Буфер для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Один JSON-объект на строку."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Одиночный ответ (например, ошибка) выводится одной строкой."""
+        return ''.join(self.render_rows([data])).encode(self.charset)
+
+    def render_rows(self, rows):
+        """Строки для потоковой выдачи, по одной на объект."""
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Таблица с заголовком из заданных столбцов или ключей первого объекта.
+
+    Списки записываются в ячейку JSON-массивом, чтобы запятые и точки
+    с запятой в именах не ломали разбор при обратной загрузке.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.render_rows(rows)).encode(self.charset)
+
+    def render_rows(self, rows, header=None):
+        """Строки для потоковой выдачи; с header заголовок есть и у пустой таблицы."""
+        writer = csv.writer(_Echo())
+        if header is not None:
+            header = list(header)
+            yield writer.writerow(header)
+        for row in rows:
+            if header is None:
+                header = list(row)
+                yield writer.writerow(header)
+            yield writer.writerow([self._cell(row.get(key)) for key in header])
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return '' if value is None else value
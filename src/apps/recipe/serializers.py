@@ -1,27 +1,84 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import ImageUpload, Tag, Ingredient, Recipe
+from core.signals import recipes_bulk_saved
+from core.timing import TimedSerializerMixin
+from recipe.images import release_image
 
 
-class TagSerializer(serializers.ModelSerializer):
+class BaseRecipeAttrSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Базовый сериализатор атрибутов рецепта с уникальным именем."""
+
+    def validate_name(self, value):
+        """Имя уникально для пользователя без учета регистра."""
+        user = self.context['request'].user
+        if self.Meta.model.objects.filter(user=user, name__iexact=value).exists():
+            raise serializers.ValidationError(f'Object with name "{value}" already exists.')
+        return value
+
+
+class RecipeAttrBulkSerializer(serializers.Serializer):
+    """Список имен для пакетного поиска или создания тегов и ингредиентов."""
+    names = serializers.ListField(child=serializers.CharField(max_length=255), allow_empty=False)
+
+    def validate_names(self, value):
+        if len(value) > settings.RECIPE_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than {settings.RECIPE_BULK_MAX_ITEMS} elements.'
+            )
+        return value
+
+
+class TagSerializer(BaseRecipeAttrSerializer):
     """Сериализатор для объектов тега."""
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(BaseRecipeAttrSerializer):
     """Сериализатор для объектов ингредиента."""
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class ImageDerivativesField(serializers.Field):
+    """Ссылки на уменьшенные копии изображения: {размер: {формат: url}}.
+
+    Пустой словарь, пока копии не построены.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'image_derivatives')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return derivative_urls(value, self.context.get('request'))
+
+
+def derivative_urls(derivatives, request):
+    """{размер: {формат: путь}} в {размер: {формат: url}}, абсолютные при наличии запроса."""
+    if not derivatives:
+        return {}
+    storage = Recipe._meta.get_field('image').storage
+    build = request.build_absolute_uri if request is not None else str
+    return {
+        label: {fmt: build(storage.url(path)) for fmt, path in files.items()}
+        for label, files in derivatives.items()
+    }
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для объектов рецепта."""
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -31,25 +88,269 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    thumbnails = ImageDerivativesField()
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link'
+            'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link', 'thumbnails'
         )
         read_only_fields = ('id',)
 
 
+class RecipeTagSerializer(serializers.ModelSerializer):
+    """Тег внутри рецепта.
+
+    Без recipe_count: счетчик меняется при изменении других рецептов,
+    а версия рецепта и его ETag при этом остаются прежними.
+    """
+
+    class Meta:
+        model = Tag
+        fields = ('id', 'name')
+
+
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    """Ингредиент внутри рецепта, без recipe_count по той же причине."""
+
+    class Meta:
+        model = Ingredient
+        fields = ('id', 'name')
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Сериализатор для детальной информации."""
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    ingredients = RecipeIngredientSerializer(many=True, read_only=True)
+    tags = RecipeTagSerializer(many=True, read_only=True)
+
+
+class RecipeRowListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """Страница строк values(): связи читаются одним запросом на каждую связующую таблицу."""
+
+    links = None
+
+    def to_representation(self, data):
+        rows = list(data)
+        links = self.links or self.child.load_links([row['id'] for row in rows])
+        return [self.child.represent(row, links) for row in rows]
 
+    async def aload_links(self):
+        """Читает связи страницы асинхронно, после этого data не обращается к БД."""
+        self.links = await self.child.aload_links([row['id'] for row in self.instance])
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+
+class RecipeRowSerializer(TimedSerializerMixin, serializers.BaseSerializer):
+    """Только чтение: тот же JSON, что у RecipeSerializer, из строк values().
+
+    Для больших страниц списка: вместо полей DRF на каждое значение строка
+    собирается обычным словарем, а id тегов и ингредиентов берутся по
+    связующим таблицам без загрузки самих объектов.
+    """
+    row_fields = ('id', 'title', 'time_minutes', 'price', 'link', 'image_derivatives')
+    link_fields = {'ingredients': 'ingredient', 'tags': 'tag'}  # поле: модель в связующей таблице
+
+    class Meta:
+        list_serializer_class = RecipeRowListSerializer
+
+    def to_representation(self, row):
+        return self.represent(row, self.load_links([row['id']]))
+
+    def represent(self, row, links):
+        recipe_id = row['id']
+        return {
+            'id': recipe_id,
+            'title': row['title'],
+            'ingredients': links['ingredients'].get(recipe_id, []),
+            'tags': links['tags'].get(recipe_id, []),
+            'time_minutes': row['time_minutes'],
+            'price': format(row['price'], 'f'),  # numeric(5, 2) уже с двумя знаками, как у DecimalField
+            'link': row['link'],
+            'thumbnails': derivative_urls(row['image_derivatives'], self.context.get('request')),
+        }
+
+    def load_links(self, recipe_ids):
+        """{поле: {id рецепта: [id связанных объектов]}} для набора рецептов."""
+        return {
+            field: self._group(self._link_rows(model, recipe_ids))
+            for field, model in self.link_fields.items()
+        }
+
+    async def aload_links(self, recipe_ids):
+        links = {}
+        for field, model in self.link_fields.items():
+            links[field] = self._group([link async for link in self._link_rows(model, recipe_ids)])
+        return links
+
+    def _link_rows(self, model, recipe_ids):
+        through = getattr(Recipe, f'{model}s').through
+        # Порядок по id связанного объекта, как у prefetch в RecipeViewSet
+        links = through.objects.filter(recipe_id__in=recipe_ids).order_by('recipe_id', f'{model}_id')
+        return links.values_list('recipe_id', f'{model}_id')
+
+    def _group(self, links):
+        grouped = {}
+        for recipe_id, pk in links:
+            grouped.setdefault(recipe_id, []).append(pk)
+        return grouped
+
+
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """Проверка и запись пакета рецептов фиксированным числом запросов."""
+
+    def to_internal_value(self, data):
+        """Проверяет принадлежность всех id пользователю тремя запросами на весь пакет.
+
+        Ошибки возвращаются списком по элементам, как и ошибки полей,
+        поэтому проверка сделана здесь, а не в validate().
+        """
+        attrs = super().to_internal_value(data)
+        user = self.context['request'].user
+        owned = {
+            'tags': self._owned_ids(Tag, user, attrs, 'tags'),
+            'ingredients': self._owned_ids(Ingredient, user, attrs, 'ingredients'),
+        }
+        recipe_ids = [item['id'] for item in attrs if 'id' in item]
+        owned_recipes = set(
+            Recipe.objects.filter(user=user, pk__in=recipe_ids).values_list('pk', flat=True)
+        )
+
+        errors, seen = [], set()
+        for item in attrs:
+            error = {}
+            for field, ids in owned.items():
+                missing = [pk for pk in item.get(field, []) if pk not in ids]
+                if missing:
+                    error[field] = [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]
+            if 'id' in item:
+                if item['id'] not in owned_recipes:
+                    error['id'] = [f'Invalid pk "{item["id"]}" - object does not exist.']
+                elif item['id'] in seen:
+                    error['id'] = ['Recipe is listed more than once.']
+                seen.add(item['id'])
+            errors.append(error)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    @staticmethod
+    def _owned_ids(model, user, attrs, field):
+        ids = {pk for item in attrs for pk in item.get(field, [])}
+        if not ids:
+            return set()
+        return set(model.objects.filter(user=user, pk__in=ids).values_list('pk', flat=True))
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Вставляет новые рецепты и обновляет существующие пакетно, вместе со связями."""
+        now = timezone.now()
+        existing = Recipe.objects.defer('search_vector').in_bulk(
+            [item['id'] for item in validated_data if 'id' in item]
+        )
+        recipes, created, updated = [], [], []
+        for item in validated_data:
+            fields = {k: v for k, v in item.items() if k not in ('id', 'tags', 'ingredients')}
+            if 'id' in item:
+                recipe = existing[item['id']]
+                for name, value in fields.items():
+                    setattr(recipe, name, value)
+                recipe.updated_at = now
+                recipe.version = F('version') + 1
+                updated.append(recipe)
+            else:
+                recipe = Recipe(**fields)
+                created.append(recipe)
+            recipes.append(recipe)
+
+        Recipe.objects.bulk_create(created)
+        if updated:
+            Recipe.objects.bulk_update(
+                updated, ['title', 'time_minutes', 'price', 'link', 'updated_at', 'version']
+            )
+
+        updated_ids = [recipe.pk for recipe in updated]
+        affected = {}
+        for field, through, column in (
+            ('tags', Recipe.tags.through, 'tag_id'),
+            ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+        ):
+            # Связи обновляемых рецептов заменяются целиком, как при PUT
+            old_links = through.objects.filter(recipe_id__in=updated_ids)
+            affected[field] = set(old_links.values_list(column, flat=True))
+            old_links.delete()
+            links = [
+                through(recipe_id=recipe.pk, **{column: pk})
+                for recipe, item in zip(recipes, validated_data)
+                for pk in dict.fromkeys(item.get(field, []))
+            ]
+            through.objects.bulk_create(links)
+            affected[field].update(getattr(link, column) for link in links)
+
+        recipes_bulk_saved.send(
+            sender=Recipe,
+            user_ids={recipe.user_id for recipe in recipes},
+            recipe_ids=[recipe.pk for recipe in recipes],
+            tag_ids=affected['tags'],
+            ingredient_ids=affected['ingredients'],
+        )
+        return recipes
+
+
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    """Элемент пакета: без id создает рецепт, с id полностью заменяет существующий."""
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link'
+        )
+        list_serializer_class = RecipeBulkListSerializer
+
+    def validate(self, attrs):
+        """Элемент с id заменяет рецепт целиком, как PUT, поэтому связи в нем обязательны.
+
+        Иначе пропущенное поле молча удалило бы все теги или ингредиенты рецепта.
+        """
+        if 'id' in attrs:
+            missing = {
+                field: [self.fields[field].error_messages['required']]
+                for field in ('tags', 'ingredients') if field not in attrs
+            }
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для изображения рецепта."""
+    thumbnails = ImageDerivativesField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'thumbnails')
         read_only_fields = ('id',)
+
+    def update(self, instance, validated_data):
+        release_image(instance.image.name, instance.image_derivatives)
+        instance.image_derivatives = {}  # копии старого изображения больше не актуальны
+        return super().update(instance, validated_data)
+
+
+class ImageUploadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Сериализатор сессии загрузки изображения по частям."""
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'filename', 'size', 'offset', 'created_at')
+        read_only_fields = ('id', 'offset', 'created_at')
+
+    def validate_size(self, value):
+        """Размер проверяется до приема первой части."""
+        if not 0 < value <= settings.RECIPE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Size must be between 1 and {settings.RECIPE_UPLOAD_MAX_SIZE} bytes.'
+            )
+        return value
@@ -0,0 +1,39 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+from core.signals import recipes_bulk_saved
+from recipe.cache import bump_user_version
+from recipe.images import release_image
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def user_data_changed(sender, instance, **kwargs):
+    """Инвалидирует кэш ответов владельца измененного объекта."""
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_images(sender, instance, **kwargs):
+    """Освобождает файлы изображения удаленного рецепта."""
+    release_image(instance.image.name, instance.image_derivatives)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, **kwargs):
+    """Инвалидирует кэш ответов при изменении тегов и ингредиентов рецепта."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_user_version(instance.user_id)
+
+
+@receiver(recipes_bulk_saved)
+def recipes_bulk_saved_cache(sender, user_ids, **kwargs):
+    """Инвалидирует кэш ответов после массовой записи рецептов."""
+    for user_id in user_ids:
+        bump_user_version(user_id)
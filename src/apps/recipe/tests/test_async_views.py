@@ -0,0 +1,138 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+User = get_user_model()
+
+
+def body(response):
+    return json.loads(response.content)
+
+
+class AsyncViewsTests(TestCase):
+    """Тестирование асинхронных list и retrieve."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        token = Token.objects.create(user=self.user)
+        self.auth = {'Authorization': f'Token {token.key}'}
+        self.async_client = AsyncClient()
+        self.sync_client = APIClient()
+        self.sync_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.tag = Tag.objects.create(user=self.user, name='Веган')
+        Tag.objects.create(user=self.user, name='Десерт')
+        ingredient = Ingredient.objects.create(user=self.user, name='Тофу')
+        for i in range(3):
+            recipe = Recipe.objects.create(user=self.user, title=f'Суп {i}', time_minutes=5 + i, price='1.50')
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(ingredient)
+
+        other = User.objects.create_user('other@appdev.com', 'testpass')
+        self.other_recipe = Recipe.objects.create(user=other, title='Чужой', time_minutes=5, price='2.00')
+
+    async def get(self, url, params=None, headers=None):
+        # AsyncClient(headers=...) не передает заголовки в scope, поэтому они задаются в каждом запросе
+        return await self.async_client.get(url, params, headers={**self.auth, **(headers or {})})
+
+    async def sync_get(self, url, params=None, **extra):
+        return await sync_to_async(self.sync_client.get)(url, params, **extra)
+
+    async def test_list_matches_sync(self):
+        """Списки совпадают с синхронными маршрутами, включая фильтры."""
+        cases = (
+            ('recipe-list', {}),
+            ('recipe-list', {'tags': str(self.tag.id), 'ordering': '-time_minutes'}),
+            ('tag-list', {'assigned_only': 1}),
+            ('ingredient-list', {}),
+        )
+        for name, params in cases:
+            with self.subTest(name=name, params=params):
+                res = await self.get(reverse(f'recipe:async-{name}'), params)
+                expected = await self.sync_get(reverse(f'recipe:{name}'), params)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(body(res)['results'], expected.data['results'])
+
+    async def test_pagination_links_async_route(self):
+        """Ссылки пагинации ведут на асинхронный маршрут, курсор работает."""
+        url = reverse('recipe:async-recipe-list')
+        first = body(await self.get(url, {'page_size': 2}))
+        second = body(await self.get(first['next']))
+
+        self.assertIn(url, first['next'])
+        self.assertEqual([r['title'] for r in first['results'] + second['results']], ['Суп 0', 'Суп 1', 'Суп 2'])
+        self.assertIsNone(second['next'])
+
+    async def test_list_cache(self):
+        """Повторный список отдается из кэша ответов, If-None-Match дает 304."""
+        url = reverse('recipe:async-recipe-list')
+        first = await self.get(url)
+        second = await self.get(url)
+        not_modified = await self.get(url, headers={'If-None-Match': first['ETag']})
+
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(body(first), body(second))
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_retrieve_matches_sync(self):
+        """Детальный рецепт совпадает с синхронным, включая ETag и 304."""
+        recipe = await Recipe.objects.filter(user=self.user).afirst()
+        res = await self.get(reverse('recipe:async-recipe-detail', args=[recipe.id]))
+        expected = await self.sync_get(reverse('recipe:recipe-detail', args=[recipe.id]))
+        not_modified = await self.get(
+            reverse('recipe:async-recipe-detail', args=[recipe.id]), headers={'If-None-Match': res['ETag']}
+        )
+
+        self.assertEqual(body(res), expected.data)
+        self.assertEqual(res['ETag'], expected['ETag'])
+        self.assertEqual(res['Last-Modified'], expected['Last-Modified'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_retrieve_tag(self):
+        """Тег отдается тем же сериализатором."""
+        res = await self.get(reverse('recipe:async-tag-detail', args=[self.tag.id]))
+
+        self.assertEqual(body(res), {'id': self.tag.id, 'name': 'Веган', 'recipe_count': 3})
+
+    async def test_other_user_not_found(self):
+        """Чужой рецепт не находится."""
+        res = await self.get(reverse('recipe:async-recipe-detail', args=[self.other_recipe.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(body(res), {'detail': 'No Recipe matches the given query.'})
+
+    async def test_auth_required(self):
+        """Без токена и с неверным токеном ответ 401, как у синхронных маршрутов."""
+        url = reverse('recipe:async-recipe-list')
+        anonymous = await self.async_client.get(url)
+        invalid = await self.async_client.get(url, headers={'Authorization': 'Token wrong'})
+
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(anonymous['WWW-Authenticate'], 'Token')
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(body(invalid), {'detail': 'Invalid token.'})
+
+    async def test_inactive_user(self):
+        """Токен деактивированного пользователя не проходит проверку."""
+        self.user.is_active = False
+        await self.user.asave()
+
+        res = await self.get(reverse('recipe:async-tag-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_read_only(self):
+        """Изменение через асинхронные маршруты недоступно."""
+        res = await self.async_client.post(reverse('recipe:async-tag-list'), {'name': 'Новый'}, headers=self.auth)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,224 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient, Tag
+
+
+User = get_user_model()
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def recipe_payload(**params):
+    """Элемент пакета рецептов."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': '5.00',
+    }
+    defaults.update(params)
+    return defaults
+
+
+class RecipeBulkApiTests(TestCase):
+    """Тестирование пакетного создания и обновления рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Веган')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Тофу')
+
+    def test_bulk_create(self):
+        """Тест на создание пакета рецептов со связями."""
+        payload = [
+            recipe_payload(title='Тофу карри', tags=[self.tag.id], ingredients=[self.ingredient.id]),
+            recipe_payload(title='Суп'),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data], ['Тофу карри', 'Суп'])
+        recipe = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_bulk_update(self):
+        """Тест на замену существующего рецепта в пакете."""
+        recipe = Recipe.objects.create(user=self.user, title='Старое', time_minutes=5, price=1)
+        recipe.tags.add(self.tag)
+        recipe.refresh_from_db()
+        version = recipe.version
+
+        payload = [recipe_payload(id=recipe.id, title='Новое', tags=[], ingredients=[self.ingredient.id])]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(recipe.title, 'Новое')
+        self.assertEqual(recipe.version, version + 1)
+        self.assertEqual(list(recipe.tags.all()), [])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+        self.tag.refresh_from_db()
+        self.ingredient.refresh_from_db()
+        self.assertEqual((self.tag.recipe_count, self.ingredient.recipe_count), (0, 1))
+
+    def test_update_requires_links(self):
+        """Тест на обязательные связи при замене: пропущенное поле не удаляет связи рецепта."""
+        recipe = Recipe.objects.create(user=self.user, title='Старое', time_minutes=5, price=1)
+        recipe.tags.add(self.tag)
+
+        payload = [
+            recipe_payload(title='Новый'),
+            recipe_payload(id=recipe.id, title='Новое', ingredients=[self.ingredient.id]),
+        ]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(list(res.data[1]), ['tags'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Старое')
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+
+    def test_errors_reported_per_item(self):
+        """Тест на ошибки по каждому элементу и отсутствие частичной записи."""
+        user2 = User.objects.create_user('other@appdev.com', 'testpass')
+        foreign_tag = Tag.objects.create(user=user2, name='Чужой')
+        payload = [
+            recipe_payload(title='Верный'),
+            recipe_payload(tags=[foreign_tag.id]),
+            recipe_payload(ingredients=[0]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertIn('ingredients', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_field_errors_reported_per_item(self):
+        """Тест на ошибки полей по каждому элементу."""
+        res = self.client.post(
+            RECIPES_BULK_URL, [recipe_payload(), recipe_payload(title='')], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', res.data[1])
+
+    def test_foreign_recipe_not_updated(self):
+        """Тест на запрет обновления чужого рецепта."""
+        user2 = User.objects.create_user('other@appdev.com', 'testpass')
+        recipe = Recipe.objects.create(user=user2, title='Чужой', time_minutes=5, price=1)
+
+        res = self.client.post(
+            RECIPES_BULK_URL, [recipe_payload(id=recipe.id, tags=[], ingredients=[])], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_batch_size_limited(self):
+        """Тест на ограничение размера пакета."""
+        res = self.client.post(RECIPES_BULK_URL, [recipe_payload()] * 3, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_fixed(self):
+        """Тест на фиксированное число запросов независимо от размера пакета."""
+        def payload(count):
+            return [
+                recipe_payload(title=f'Рецепт {i}', tags=[self.tag.id], ingredients=[self.ingredient.id])
+                for i in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(RECIPES_BULK_URL, payload(2), format='json')
+
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            res = self.client.post(RECIPES_BULK_URL, payload(30), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.count(), 32)
+
+    def test_bulk_invalidates_list_and_search(self):
+        """Тест на видимость пакета в кэшированном списке и поиске."""
+        self.client.get(RECIPES_URL)
+
+        self.client.post(
+            RECIPES_BULK_URL, [recipe_payload(title='Пирог', tags=[self.tag.id])], format='json'
+        )
+
+        self.assertEqual(len(self.client.get(RECIPES_URL).data['results']), 1)
+        res = self.client.get(RECIPES_URL, {'search': 'веган'})
+        self.assertEqual([r['title'] for r in res.data['results']], ['Пирог'])
+
+
+class RecipeAttrBulkApiTests(TestCase):
+    """Тестирование пакетного поиска или создания тегов и ингредиентов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_get_or_create_tags(self):
+        """Тест на создание новых и возврат существующих тегов."""
+        tag = Tag.objects.create(user=self.user, name='Веган')
+        Tag.objects.create(
+            user=User.objects.create_user('other@appdev.com', 'testpass'), name='Десерт'
+        )
+
+        res = self.client.post(TAGS_BULK_URL, {'names': ['веган', 'Десерт', 'десерт']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0], {'id': tag.id, 'name': 'Веган', 'created': False})
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[1]['name'], 'Десерт')
+        self.assertTrue(res.data[1]['created'])
+        self.assertTrue(Tag.objects.filter(user=self.user, pk=res.data[1]['id']).exists())
+
+    def test_get_or_create_single_query(self):
+        """Тест на один запрос к БД для всего списка имен."""
+        Ingredient.objects.create(user=self.user, name='Соль')
+        names = ['Соль'] + [f'Ингредиент {i}' for i in range(50)]
+
+        with self.assertNumQueries(1):
+            res = self.client.post(INGREDIENTS_BULK_URL, {'names': names}, format='json')
+
+        self.assertEqual(len(res.data), 51)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 51)
+
+    def test_created_visible_in_cached_list(self):
+        """Тест на сброс кэша списка после создания."""
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_BULK_URL, {'names': ['Завтрак']}, format='json')
+
+        self.assertEqual(len(self.client.get(TAGS_URL).data['results']), 1)
+
+    def test_invalid_names(self):
+        """Тест на отказ при пустом списке и пустом имени."""
+        for payload in ({'names': []}, {'names': ['']}, {}):
+            res = self.client.post(TAGS_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
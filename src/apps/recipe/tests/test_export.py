@@ -0,0 +1,142 @@
+import csv
+import gzip
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+User = get_user_model()
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def read(response):
+    """Тело потокового ответа с распаковкой gzip."""
+    body = b''.join(response.streaming_content)
+    if response.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body.decode('utf-8')
+
+
+class RecipeExportApiTests(TestCase):
+    """Тестирование потоковой выгрузки рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Веган')
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=name) for name in ('Тофу', 'Рис, бурый')
+        ]
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Тофу с рисом', time_minutes=20, price='7.50', link='https://example.com'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(*self.ingredients)
+        Recipe.objects.create(user=self.user, title='Чай', time_minutes=3, price='1.00')
+
+        other = User.objects.create_user('other@appdev.com', 'testpass')
+        Recipe.objects.create(user=other, title='Чужой', time_minutes=5, price='2.00')
+
+    def test_auth_required(self):
+        """Выгрузка доступна только авторизованному пользователю."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """По умолчанию рецепты пользователя выгружаются в NDJSON."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res, StreamingHttpResponse)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        self.assertIn('recipes.ndjson', res['Content-Disposition'])
+        rows = [json.loads(line) for line in read(res).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Тофу с рисом', 'Чай'])
+        self.assertEqual(rows[0], {
+            'id': self.recipe.id,
+            'title': 'Тофу с рисом',
+            'time_minutes': 20,
+            'price': '7.50',
+            'link': 'https://example.com',
+            'tags': ['Веган'],
+            'ingredients': ['Рис, бурый', 'Тофу'],
+        })
+        self.assertEqual(rows[1]['tags'], [])
+
+    def test_export_csv(self):
+        """CSV с заголовком, списки записаны JSON-массивами."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(read(res))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['title'], 'Тофу с рисом')
+        self.assertEqual(rows[0]['price'], '7.50')
+        self.assertEqual(json.loads(rows[0]['ingredients']), ['Рис, бурый', 'Тофу'])
+        self.assertEqual(json.loads(rows[1]['tags']), [])
+
+    def test_export_csv_empty(self):
+        """У аккаунта без рецептов CSV состоит из одного заголовка."""
+        Recipe.objects.filter(user=self.user).delete()
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(csv.reader(io.StringIO(read(res)))),
+            [['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients']],
+        )
+
+    def test_export_gzip(self):
+        """При Accept-Encoding: gzip ответ сжимается."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(len(read(res).splitlines()), 2)
+
+    def test_gzip_refused(self):
+        """При gzip;q=0 ответ не сжимается, даже если подходит любое кодирование."""
+        for header in ('gzip;q=0, deflate', 'gzip; q=0.0, *', 'br'):
+            with self.subTest(header=header):
+                res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING=header)
+
+                self.assertNotIn('Content-Encoding', res)
+                self.assertEqual(len(read(res).splitlines()), 2)
+
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='br, *;q=0.5')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_unknown_format(self):
+        """Неизвестный формат не поддерживается."""
+        res = self.client.get(EXPORT_URL, {'format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=10)
+    def test_queries_per_chunk(self):
+        """Связи подгружаются двумя запросами на порцию, а не на рецепт."""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Рецепт {i}', time_minutes=1, price='1.00') for i in range(23)
+        )
+        res = self.client.get(EXPORT_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            body = read(res)
+
+        self.assertEqual(len(body.splitlines()), 25)
+        self.assertEqual(len(ctx.captured_queries), 1 + 3 * 2)  # курсор и по два запроса на 3 порции
@@ -0,0 +1,138 @@
+import os
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, StoredFile
+from recipe import images
+
+
+User = get_user_model()
+SIZES = {'small': 40, 'large': 120}
+
+
+def jpeg_bytes(size=(800, 400), orientation=None):
+    """Создание JPEG с EXIF."""
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+def run_inline(func, *args):
+    """Выполнение фоновой задачи в текущем потоке."""
+    return func(*args)
+
+
+class RenderDerivativesTests(TestCase):
+    """Тестирование построения уменьшенных копий."""
+
+    def test_sizes_and_formats(self):
+        """Тест на размеры и форматы копий."""
+        result = images.render_derivatives(BytesIO(jpeg_bytes()), SIZES, ('webp', 'jpeg'))
+
+        self.assertEqual(set(result), {'small', 'large'})
+        with Image.open(BytesIO(result['large']['jpeg'])) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (120, 60)))
+        with Image.open(BytesIO(result['small']['webp'])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (40, 20)))
+
+    def test_exif_applied_and_stripped(self):
+        """Тест на поворот по EXIF и удаление метаданных."""
+        result = images.render_derivatives(BytesIO(jpeg_bytes(orientation=6)), SIZES, ('jpeg',))
+
+        with Image.open(BytesIO(result['large']['jpeg'])) as image:
+            self.assertEqual(image.size, (60, 120))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_transparent_png(self):
+        """Тест на копии изображения с прозрачностью."""
+        buffer = BytesIO()
+        Image.new('RGBA', (100, 100)).save(buffer, format='PNG')
+
+        result = images.render_derivatives(buffer, SIZES, ('webp', 'jpeg'))
+
+        with Image.open(BytesIO(result['small']['jpeg'])) as image:
+            self.assertEqual(image.mode, 'RGB')
+
+
+@override_settings(RECIPE_IMAGE_SIZES=SIZES)
+@patch('recipe.images._submit', run_inline)
+class RecipeImageDerivativesTests(TestCase):
+    """Тестирование фонового построения копий при загрузке изображения."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='Пирог', time_minutes=30, price=5)
+
+    def tearDown(self):
+        if not Recipe.objects.filter(pk=self.recipe.pk).exists():
+            return
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        for files in self.recipe.image_derivatives.values():
+            for path in files.values():
+                storage.delete(path)
+        self.recipe.image.delete()
+
+    def upload(self):
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+        image = SimpleUploadedFile('photo.jpg', jpeg_bytes(), content_type='image/jpeg')
+        return self.client.post(url, {'image': image}, format='multipart')
+
+    def test_upload_schedules_derivatives(self):
+        """Тест на построение копий после ответа на загрузку."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['thumbnails'], {})  # ответ не ждет обработки
+
+        for callback in callbacks:
+            callback()
+        self.recipe.refresh_from_db()
+        paths = self.recipe.image_derivatives
+        self.assertEqual(set(paths), {'small', 'large'})
+        self.assertTrue(paths['small']['webp'].endswith('.webp'))
+        self.assertTrue(os.path.exists(self.recipe.image.storage.path(paths['large']['jpeg'])))
+
+        res = self.client.get(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+        self.assertTrue(res.data['thumbnails']['small']['jpeg'].startswith('http://testserver/'))
+
+    def test_files_released_on_delete(self):
+        """Тест на удаление файлов вместе с рецептом."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        self.recipe.refresh_from_db()
+        path = self.recipe.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_stale_derivatives_discarded(self):
+        """Тест на отбрасывание копий замененного изображения."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.upload()
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        Recipe.objects.filter(pk=self.recipe.pk).update(image='uploads/recipe/other.jpg')
+
+        callbacks[0]()
+
+        self.assertFalse(StoredFile.objects.filter(name__endswith='.webp').exists())
+        self.recipe.image.storage.delete(name)
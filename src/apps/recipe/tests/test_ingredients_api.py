@@ -4,11 +4,13 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
 from recipe.serializers import IngredientSerializer
+from recipe.views import suggest_cache
 
 User = get_user_model()
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+SUGGEST_URL = reverse('recipe:ingredient-suggest')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -45,7 +47,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('name')
         serializer = IngredientSerializer(ingredients, many=True)  # many=True для сериализации списка
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Тест на получение ингредиентов только для текущего пользователя."""
@@ -59,5 +61,71 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+
+    def test_assigned_ingredients_with_counts(self):
+        """Тест на назначенные ингредиенты с числом рецептов."""
+        salt = Ingredient.objects.create(user=self.user, name='Соль')
+        Ingredient.objects.create(user=self.user, name='Перец')
+        for title in ('Суп', 'Рагу', 'Салат'):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=1)
+            recipe.ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [{'id': salt.id, 'name': 'Соль', 'recipe_count': 3}])
+
+
+class IngredientSuggestApiTests(TestCase):
+    """Тест подсказок по именам ингредиентов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        suggest_cache.clear()
+
+    def suggest(self, text, **params):
+        res = self.client.get(SUGGEST_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [ingredient['name'] for ingredient in res.data]
+
+    def test_prefix_matches_first(self):
+        """Тест на приоритет совпадений по префиксу."""
+        for name in ('Картофель', 'Карри', 'Морковь', 'Укроп'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        self.assertEqual(self.suggest('кар')[:2], ['Карри', 'Картофель'])
+        self.assertNotIn('Укроп', self.suggest('кар'))
+
+    def test_fuzzy_match(self):
+        """Тест на нечеткое совпадение с опечаткой."""
+        Ingredient.objects.create(user=self.user, name='Pineapple')
+
+        self.assertEqual(self.suggest('pinaple'), ['Pineapple'])
+
+    def test_limited_to_user(self):
+        """Тест на подсказки только из ингредиентов текущего пользователя."""
+        user2 = User.objects.create_user('other@appdev.com', 'testpass')
+        Ingredient.objects.create(user=user2, name='Соль')
+
+        self.assertEqual(self.suggest('соль'), [])
+
+    def test_limit(self):
+        """Тест на ограничение количества подсказок."""
+        for i in range(5):
+            Ingredient.objects.create(user=self.user, name=f'Перец {i}')
+
+        self.assertEqual(len(self.suggest('перец', limit=3)), 3)
+
+    def test_repeated_prefix_cached(self):
+        """Тест на повторный запрос префикса без обращения к БД."""
+        Ingredient.objects.create(user=self.user, name='Сахар')
+        self.suggest('сах')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('Сах'), ['Сахар'])
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.views import suggest_cache
+
+
+User = get_user_model()
+USERS = 40
+# Способы чтения, которые обходят таблицу целиком; выключенные, они выбираются только без альтернативы
+PLANNER_OFF = ('enable_seqscan', 'enable_hashjoin', 'enable_mergejoin')
+
+
+def full_scans(node):
+    """Узлы плана, читающие таблицу целиком.
+
+    Кроме Seq Scan это обход индекса без условия (Index Cond): при
+    запрете seqscan Postgres выбирает его вместо последовательного чтения.
+    """
+    if node['Node Type'] == 'Seq Scan' or (
+        node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node
+    ):
+        yield f"{node['Node Type']} on {node['Relation Name']}"
+    for child in node.get('Plans', ()):
+        yield from full_scans(child)
+
+
+class QueryPlanTests(TestCase):
+    """Проверка планов запросов каждого эндпоинта.
+
+    Запросы эндпоинта перехватываются и выполняются через EXPLAIN с
+    выключенными seqscan, hashjoin и mergejoin: при таком запрете Postgres
+    читает таблицу целиком, только если подходящего индекса нет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Данные текущего пользователя - малая доля таблиц, как в рабочей базе
+        users = [User.objects.create_user(f'user{i}@appdev.com') for i in range(USERS)]
+        cls.user = users[0]
+        Tag.objects.bulk_create(Tag(user=u, name=f'Тег {i}') for u in users for i in range(20))
+        Ingredient.objects.bulk_create(Ingredient(user=u, name=f'Ингредиент {i}') for u in users for i in range(20))
+        Recipe.objects.bulk_create(
+            Recipe(user=u, title=f'Рецепт {i}', time_minutes=i, price=i % 7) for u in users for i in range(50)
+        )
+        for model, through, column in (
+            (Tag, Recipe.tags.through, 'tag_id'),
+            (Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+        ):
+            links = []
+            for u in users:
+                ids = list(model.objects.filter(user=u).values_list('id', flat=True))
+                recipe_ids = Recipe.objects.filter(user=u).values_list('id', flat=True)
+                for i, recipe_id in enumerate(recipe_ids):
+                    links += [through(recipe_id=recipe_id, **{column: ids[(i + k) % 15]}) for k in (0, 3)]
+            through.objects.bulk_create(links)
+        update_search_vectors(Recipe.objects.values('id'))
+
+        cls.tag = Tag.objects.filter(user=cls.user).first()
+        cls.ingredient = Ingredient.objects.filter(user=cls.user).first()
+        cls.recipe = Recipe.objects.filter(user=cls.user).first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        suggest_cache.clear()
+
+    def assertNoSeqScan(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params or {})
+        self.assertEqual(res.status_code, 200, res.data)
+
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects)
+        with connection.cursor() as cursor:
+            for option in PLANNER_OFF:
+                cursor.execute(f'SET LOCAL {option} = off')
+            for sql in selects:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plan = cursor.fetchone()[0][0]['Plan']
+                self.assertEqual(list(full_scans(plan)), [], f'{url} {params}\n{sql}')
+            for option in PLANNER_OFF:
+                cursor.execute(f'SET LOCAL {option} = on')
+        return res
+
+    def test_tag_endpoints(self):
+        url = reverse('recipe:tag-list')
+        self.assertNoSeqScan(url)
+        self.assertNoSeqScan(url, {'ordering': 'id'})
+        self.assertNoSeqScan(url, {'assigned_only': 1})
+        self.assertNoSeqScan(url, {'ordering': '-recipe_count'})
+        self.assertNoSeqScan(reverse('recipe:tag-suggest'), {'q': 'тег'})
+
+    def test_ingredient_endpoints(self):
+        url = reverse('recipe:ingredient-list')
+        self.assertNoSeqScan(url)
+        self.assertNoSeqScan(url, {'assigned_only': 1, 'ordering': 'recipe_count'})
+        self.assertNoSeqScan(reverse('recipe:ingredient-suggest'), {'q': 'ингр'})
+
+    def test_recipe_list(self):
+        url = reverse('recipe:recipe-list')
+        res = self.assertNoSeqScan(url, {'page_size': 10})
+        self.assertNoSeqScan(res.data['next'])
+        for ordering in ('price', '-time_minutes', 'title'):
+            self.assertNoSeqScan(url, {'ordering': ordering})
+
+    def test_recipe_filters(self):
+        url = reverse('recipe:recipe-list')
+        self.assertNoSeqScan(url, {'tags': self.tag.id})
+        self.assertNoSeqScan(url, {'ingredients': self.ingredient.id})
+        self.assertNoSeqScan(url, {'search': 'рецепт'})
+
+    def test_recipe_detail(self):
+        self.assertNoSeqScan(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+
+    def test_through_reverse_index(self):
+        """Рецепты тега и ингредиента выбираются по обратному индексу."""
+        for through, lookup, index in (
+            (Recipe.tags.through, {'tag_id': self.tag.id}, 'recipe_tags_tag_recipe_idx'),
+            (
+                Recipe.ingredients.through, {'ingredient_id': self.ingredient.id},
+                'recipe_ingredients_ingredient_recipe_idx',
+            ),
+        ):
+            plan = through.objects.filter(**lookup).values('recipe_id').explain()
+            self.assertIn(index, plan)
@@ -1,9 +1,12 @@
+import base64
+import json
 import os
 import tempfile
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from PIL import Image
 from rest_framework import test, status
 from rest_framework.test import APIClient
@@ -89,7 +92,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Тест на получение рецептов для текущего пользователя."""
@@ -105,8 +108,8 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Тест на просмотр детальной информации о рецепте."""
@@ -190,6 +193,352 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class RecipeQueryCountTests(TestCase):
+    """Тестирование количества SQL-запросов к API рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def create_recipes(self, count):
+        """Создание рецептов с тегом и ингредиентом."""
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'Рецепт {i}')
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def test_list_query_count_fixed(self):
+        """Тест на фиксированное число запросов при получении списка."""
+        self.create_recipes(2)
+        with self.assertNumQueries(3):  # рецепты + ингредиенты + теги
+            self.client.get(RECIPES_URL)
+
+        self.create_recipes(20)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 22)
+
+    def test_filter_query_count_fixed(self):
+        """Тест на фиксированное число запросов при фильтрации."""
+        self.create_recipes(15)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPES_URL,
+                {'tags': self.tag.id, 'ingredients': self.ingredient.id}
+            )
+
+        self.assertEqual(len(res.data['results']), 15)
+
+    def test_detail_query_count_fixed(self):
+        """Тест на фиксированное число запросов при просмотре рецепта."""
+        recipe = sample_recipe(user=self.user)
+        for i in range(10):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Тег {i}'))
+            recipe.ingredients.add(sample_ingredient(user=self.user, name=f'Ингредиент {i}'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+
+class RecipePaginationTests(TestCase):
+    """Тестирование постраничного вывода рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def collect_pages(self, params):
+        """Проход по всем страницам, возвращает id рецептов в порядке выдачи."""
+        ids = []
+        res = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+            if not res.data['next']:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_pages_follow_ordering(self):
+        """Тест на обход страниц по цене с повторяющимися значениями."""
+        for i in range(7):
+            sample_recipe(user=self.user, title=f'Рецепт {i}', price=i % 3)
+
+        ids = self.collect_pages({'ordering': '-price', 'page_size': 2})
+
+        expected = Recipe.objects.order_by('-price', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_previous_page(self):
+        """Тест на возврат к предыдущей странице."""
+        recipes = [sample_recipe(user=self.user, title=f'Рецепт {i}') for i in range(5)]
+
+        first = self.client.get(RECIPES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual([r['id'] for r in second.data['results']], [r.id for r in recipes[2:4]])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_limited(self):
+        """Тест на ограничение размера страницы сервером."""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Рецепт {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_unsupported_ordering(self):
+        """Тест на сортировку по неподдерживаемому полю."""
+        res = self.client.get(RECIPES_URL, {'ordering': 'link'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        """Тест на некорректный курсор."""
+        res = self.client.get(RECIPES_URL, {'cursor': 'garbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        """Тест на курсор с подмененными значениями позиции."""
+        sample_recipe(user=self.user)
+        cases = (
+            ({}, ['abc']),
+            ({}, [[1]]),
+            ({}, [{'a': 1}]),
+            ({}, [None]),
+            ({'ordering': 'price'}, ['x', 1]),
+            ({'ordering': 'price'}, ['1.00', 'abc']),
+        )
+        for params, position in cases:
+            with self.subTest(params=params, position=position):
+                data = json.dumps({'p': position, 'r': 0}).encode()
+                cursor = base64.b64encode(data).decode()
+
+                res = self.client.get(RECIPES_URL, {**params, 'cursor': cursor})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_does_not_duplicate(self):
+        """Тест на отсутствие дублей при фильтрации по нескольким тегам."""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Веган')
+        tag2 = sample_tag(user=self.user, name='Дессерт')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+
+class RecipeSearchTests(TestCase):
+    """Тестирование полнотекстового поиска рецептов."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        """Поиск рецептов, возвращает id в порядке выдачи."""
+        res = self.client.get(RECIPES_URL, {'search': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_by_title_ingredient_and_tag(self):
+        """Тест на поиск по названию, ингредиентам и тегам."""
+        soup = sample_recipe(user=self.user, title='Томатный суп')
+        salad = sample_recipe(user=self.user, title='Салат')
+        salad.ingredients.add(sample_ingredient(user=self.user, name='Томат'))
+        salad.tags.add(sample_tag(user=self.user, name='Летнее'))
+        sample_recipe(user=self.user, title='Борщ')
+
+        self.assertEqual(self.search('суп'), [soup.id])
+        self.assertEqual(self.search('томат'), [salad.id])
+        self.assertEqual(self.search('летнее'), [salad.id])
+
+    def test_search_ranked_by_relevance(self):
+        """Тест на сортировку по релевантности: название важнее тега."""
+        by_tag = sample_recipe(user=self.user, title='Салат')
+        by_tag.tags.add(sample_tag(user=self.user, name='Быстро'))
+        by_title = sample_recipe(user=self.user, title='Быстро')
+
+        self.assertEqual(self.search('быстро'), [by_title.id, by_tag.id])
+
+    def test_search_follows_renamed_tag(self):
+        """Тест на обновление поиска при переименовании тега."""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user, name='Завтрак')
+        recipe.tags.add(tag)
+
+        tag.name = 'Ужин'
+        tag.save()
+
+        self.assertEqual(self.search('завтрак'), [])
+        self.assertEqual(self.search('ужин'), [recipe.id])
+
+    def test_search_follows_removed_ingredient(self):
+        """Тест на обновление поиска при удалении ингредиента из рецепта."""
+        recipe = sample_recipe(user=self.user)
+        ingredient = sample_ingredient(user=self.user, name='Чеснок')
+        recipe.ingredients.add(ingredient)
+
+        ingredient.recipe_set.clear()
+
+        self.assertEqual(self.search('чеснок'), [])
+
+    def test_search_limited_to_user(self):
+        """Тест на поиск только среди рецептов текущего пользователя."""
+        user2 = User.objects.create_user('other@appdev.com', 'testpass')
+        sample_recipe(user=user2, title='Пирог')
+
+        self.assertEqual(self.search('пирог'), [])
+
+    def test_search_paginated(self):
+        """Тест на постраничный вывод результатов поиска."""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Пирог {i}')
+
+        res = self.client.get(RECIPES_URL, {'search': 'пирог', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(sorted(ids), list(Recipe.objects.values_list('id', flat=True).order_by('id')))
+
+
+class RecipeConditionalRequestTests(TestCase):
+    """Тестирование условных запросов к API рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_list_not_modified(self):
+        """Тест на 304 для неизменного списка без обращения к БД."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_after_write(self):
+        """Тест на смену ETag списка после изменения данных."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        sample_recipe(user=self.user, title='Новый')
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_etag_matches_body_after_shared_tag_change(self):
+        """Тест на то, что изменение другого рецепта с общим тегом не меняет тело под прежним ETag."""
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        first = self.client.get(detail_url(self.recipe.id))
+
+        sample_recipe(user=self.user, title='Другой').tags.add(tag)  # recipe_count тега вырос
+        conditional = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=first['ETag'])
+        fresh = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(conditional.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(fresh['ETag'], first['ETag'])
+        self.assertEqual(fresh.content, first.content)  # 304 не устарел: тело то же
+        self.assertEqual(fresh.data['tags'], [{'id': tag.id, 'name': tag.name}])
+
+    def test_detail_not_modified(self):
+        """Тест на 304 для рецепта без сериализации и загрузки связей."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_modified_after_tag_added(self):
+        """Тест на новую версию рецепта после добавления тега."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 1)
+
+    def test_detail_modified_after_tag_renamed(self):
+        """Тест на новую версию рецепта после переименования его тега."""
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        tag.name = 'Гарнир'
+        tag.save()
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_if_modified_since(self):
+        """Тест на 304 по If-Modified-Since."""
+        last_modified = self.client.get(detail_url(self.recipe.id))['Last-Modified']
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_if_match_current(self):
+        """Тест на обновление с актуальным If-Match."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.patch(detail_url(self.recipe.id), {'title': 'Плов'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_update_if_match_stale(self):
+        """Тест на отказ в обновлении по устаревшему If-Match."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Плов'})
+
+        res = self.client.patch(detail_url(self.recipe.id), {'title': 'Суп'}, HTTP_IF_MATCH=etag)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(self.recipe.title, 'Плов')
+
+
 class RecipeImageUploadTests(TestCase):
     """Тестирование загрузки изображений рецептов."""
 
@@ -245,9 +594,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Тест на возврат рецептов по ингредиентам."""
@@ -268,6 +617,6 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient, Tag
+from recipe.cache import cache_stats
+
+
+User = get_user_model()
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def sample_recipe(user, **params):
+    """Создание и возврат образца рецепта."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Тестирование кэша ответов списков."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'test@appdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Тест на повторный запрос списка без обращения к БД."""
+        sample_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_create_invalidates(self):
+        """Тест на инвалидацию после создания рецепта."""
+        self.client.get(RECIPES_URL)
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_m2m_change_invalidates(self):
+        """Тест на инвалидацию после изменения тегов рецепта."""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Веган')
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+    def test_delete_invalidates(self):
+        """Тест на инвалидацию после удаления ингредиента."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Соль')
+        self.client.get(INGREDIENTS_URL)
+
+        ingredient.delete()
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_other_user_write_keeps_cache(self):
+        """Тест на сохранение кэша при изменениях другого пользователя."""
+        user2 = User.objects.create_user('other@appdev.com', 'testpass')
+        self.client.get(TAGS_URL)
+
+        Tag.objects.create(user=user2, name='Фрукты')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_params_normalized(self):
+        """Тест на один ключ для запросов с одинаковыми параметрами."""
+        self.client.get(RECIPES_URL, {'tags': '2,1'})
+
+        same = self.client.get(RECIPES_URL, {'tags': '1,2,1'})
+        other = self.client.get(RECIPES_URL, {'tags': '1'})
+
+        self.assertEqual(same['X-Cache'], 'HIT')
+        self.assertEqual(other['X-Cache'], 'MISS')
+
+    def test_assigned_only_normalized(self):
+        """Тест на нормализацию параметра assigned_only."""
+        self.client.get(TAGS_URL, {'assigned_only': '0'})
+
+        res = self.client.get(TAGS_URL)
+        assigned = self.client.get(TAGS_URL, {'assigned_only': '1'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(assigned['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(TAGS_URL, {'assigned_only': '00'})['X-Cache'], 'HIT')
+
+    def test_stats_counted(self):
+        """Тест на подсчет попаданий и промахов."""
+        before = cache_stats()
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+        after = cache_stats()
+
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_error_response_not_cached(self):
+        """Тест на то, что ошибки не кэшируются."""
+        self.client.get(RECIPES_URL, {'ordering': 'link'})
+        res = self.client.get(RECIPES_URL, {'ordering': 'link'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotEqual(res.get('X-Cache'), 'HIT')
@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeRowSerializer, RecipeSerializer
+
+
+User = get_user_model()
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class RecipeRowSerializerTests(TestCase):
+    """Тестирование совпадения быстрого представления из values() с сериализаторами DRF."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        self.request = APIRequestFactory().get('/api/recipe/recipes/')
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ('Ужин', 'Веган', 'Десерт')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Соль', 'Мука')]
+
+        prices = (Decimal('1.5'), 5, Decimal('123.45'), Decimal('0.00'))
+        for i, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Рецепт "{i}" — пирог', time_minutes=i, price=price,
+                link='https://example.com/?a=1&b=2' if i % 2 else '',
+            )
+            recipe.tags.add(*reversed(tags[:i]))  # связи добавляются не по порядку id
+            recipe.ingredients.add(*ingredients[i % 2:])
+        Recipe.objects.filter(pk=recipe.pk).update(image_derivatives={
+            'small': {'webp': 'uploads/recipe/ab/cd/small.webp', 'jpeg': 'uploads/recipe/ab/cd/small.jpg'},
+            'large': {'jpeg': 'uploads/recipe/ab/cd/large.jpg'},
+        })
+
+    def rows(self):
+        return list(Recipe.objects.filter(user=self.user).order_by('id').values(*RecipeRowSerializer.row_fields))
+
+    def instances(self):
+        return list(Recipe.objects.filter(user=self.user).order_by('id').prefetch_related(
+            Prefetch('ingredients', queryset=Ingredient.objects.only('id').order_by('id')),
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+        ))
+
+    def test_list_same_json(self):
+        """Список совпадает с RecipeSerializer байт в байт, включая ссылки на копии изображения."""
+        context = {'request': self.request}
+        expected = RecipeSerializer(self.instances(), many=True, context=context).data
+
+        data = RecipeRowSerializer(self.rows(), many=True, context=context).data
+
+        self.assertEqual(render(data), render(expected))
+        self.assertTrue(data[-1]['thumbnails']['small']['webp'].startswith('http://testserver/'))
+
+    def test_links_fixed_query_count(self):
+        """Связи всей страницы читаются двумя запросами, пустая страница - без запросов."""
+        rows = self.rows()
+        with self.assertNumQueries(2):
+            RecipeRowSerializer(rows, many=True).data
+        with self.assertNumQueries(0):
+            self.assertEqual(RecipeRowSerializer([], many=True).data, [])
+
+    def test_async_links(self):
+        """После aload_links данные строятся без обращений к БД."""
+        serializer = RecipeRowSerializer(self.rows(), many=True, context={'request': self.request})
+        async_to_sync(serializer.aload_links)()
+
+        with self.assertNumQueries(0):
+            data = serializer.data
+
+        expected = RecipeSerializer(self.instances(), many=True, context={'request': self.request}).data
+        self.assertEqual(render(data), render(expected))
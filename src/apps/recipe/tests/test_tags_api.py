@@ -4,12 +4,14 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Recipe, Tag
 from recipe.serializers import TagSerializer
+from recipe.views import suggest_cache
 
 
 User = get_user_model()
 TAGS_URL = reverse('recipe:tag-list')
+SUGGEST_URL = reverse('recipe:tag-suggest')
 
 
 class PublicTagsAPITests(TestCase):
@@ -47,7 +49,7 @@ class PrivateTagsAPITests(TestCase):
         serializer = TagSerializer(tags, many=True)  # many=True для сериализации списка
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)  # сравнение сериализованных данных
+        self.assertEqual(res.data['results'], serializer.data)  # сравнение сериализованных данных
 
     def test_tags_limited_to_user(self):
         """Тест на получение тегов только для текущего пользователя."""
@@ -61,8 +63,8 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)  # проверка количества тегов
-        self.assertEqual(res.data[0]['name'], tag.name)  # проверка имени тега
+        self.assertEqual(len(res.data['results']), 1)  # проверка количества тегов
+        self.assertEqual(res.data['results'][0]['name'], tag.name)  # проверка имени тега
 
     def test_create_tag_successful(self):
         """Тест на создание тега."""
@@ -82,3 +84,61 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_tag_duplicate_name(self):
+        """Тест на отказ при создании тега с существующим именем."""
+        Tag.objects.create(user=self.user, name='Десерт')
+        res = self.client.post(TAGS_URL, {'name': 'десерт'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Тест на постраничный вывод тегов по имени."""
+        for name in ('Б', 'А', 'Г', 'В'):
+            Tag.objects.create(user=self.user, name=name)
+
+        first = self.client.get(TAGS_URL, {'page_size': 3})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([t['name'] for t in first.data['results']], ['А', 'Б', 'В'])
+        self.assertEqual([t['name'] for t in second.data['results']], ['Г'])
+        self.assertIsNone(second.data['next'])
+
+    def test_retrieve_tags_assigned_unique(self):
+        """Тест на фильтр по назначенным тегам без повторов."""
+        tag = Tag.objects.create(user=self.user, name='Завтрак')
+        Tag.objects.create(user=self.user, name='Обед')
+        for title in ('Блины', 'Каша'):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=1)
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([t['id'] for t in res.data['results']], [tag.id])
+
+    def test_tags_with_counts(self):
+        """Тест на число рецептов у каждого тега и сортировку по нему."""
+        breakfast = Tag.objects.create(user=self.user, name='Завтрак')
+        Tag.objects.create(user=self.user, name='Обед')
+        for title in ('Блины', 'Каша'):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=1)
+            recipe.tags.add(breakfast)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(
+            [(t['name'], t['recipe_count']) for t in res.data['results']], [('Завтрак', 2), ('Обед', 0)]
+        )
+
+    def test_suggest_tags(self):
+        """Тест на подсказки по именам тегов."""
+        suggest_cache.clear()
+        Tag.objects.create(user=self.user, name='Десерт')
+        Tag.objects.create(user=self.user, name='Завтрак')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'дес'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['Десерт'])
@@ -0,0 +1,177 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+
+
+User = get_user_model()
+CHUNK_TYPE = 'application/offset+octet-stream'
+
+
+def uploads_url(recipe_id):
+    return reverse('recipe:recipe-create-upload', args=[recipe_id])
+
+
+def upload_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-upload', args=[recipe_id, upload_id])
+
+
+def finalize_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-finalize-upload', args=[recipe_id, upload_id])
+
+
+def jpeg_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'green').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class RecipeResumableUploadTests(TestCase):
+    """Тестирование загрузки изображения рецепта по частям."""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        settings = override_settings(RECIPE_UPLOAD_DIR=self.upload_dir, RECIPE_UPLOAD_MAX_CHUNK=512)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user('test@appdev.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='Пирог', time_minutes=30, price=5)
+        self.data = jpeg_bytes()
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            self.recipe.image.delete()
+        shutil.rmtree(self.upload_dir)
+
+    def start(self, size=None):
+        res = self.client.post(
+            uploads_url(self.recipe.id), {'filename': 'photo.jpg', 'size': size or len(self.data)}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def send(self, upload_id, offset, chunk):
+        return self.client.generic(
+            'PATCH', upload_url(self.recipe.id, upload_id), chunk,
+            content_type=CHUNK_TYPE, HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def send_all(self, upload_id):
+        for offset in range(0, len(self.data), 512):
+            res = self.send(upload_id, offset, self.data[offset:offset + 512])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_upload_in_chunks(self):
+        """Тест на загрузку по частям и завершение."""
+        upload_id = self.start()
+
+        res = self.send_all(upload_id)
+        self.assertEqual(res['Upload-Offset'], str(len(self.data)))
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open() as image:
+            self.assertEqual(image.read(), self.data)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_resume_from_reported_offset(self):
+        """Тест на продолжение загрузки с позиции, известной серверу."""
+        upload_id = self.start()
+        self.send(upload_id, 0, self.data[:100])
+
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['offset'], 100)
+
+        res = self.send(upload_id, 50, self.data[50:150])
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 100)
+
+        self.send(upload_id, 100, self.data[100:400])
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+        self.assertEqual(res['Upload-Offset'], '400')
+
+    def test_size_limits(self):
+        """Тест на отказ до чтения тела при превышении лимитов."""
+        with override_settings(RECIPE_UPLOAD_MAX_SIZE=100):
+            res = self.client.post(uploads_url(self.recipe.id), {'filename': 'a.jpg', 'size': 101}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload_id = self.start(size=600)
+        res = self.send(upload_id, 0, b'x' * 513)  # больше RECIPE_UPLOAD_MAX_CHUNK
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        self.send(upload_id, 0, b'x' * 500)
+        res = self.send(upload_id, 500, b'x' * 101)  # больше объявленного размера
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_chunk_without_content_length(self):
+        """Тест на отказ принять часть без Content-Length или с неверным значением."""
+        upload_id = self.start()
+        url = upload_url(self.recipe.id, upload_id)
+
+        res = self.client.generic(
+            'PATCH', url, self.data[:100], content_type=CHUNK_TYPE, HTTP_UPLOAD_OFFSET='0',
+            CONTENT_LENGTH='', HTTP_TRANSFER_ENCODING='chunked',
+        )
+        self.assertEqual(res.status_code, status.HTTP_411_LENGTH_REQUIRED)
+
+        res = self.client.generic(
+            'PATCH', url, self.data[:100], content_type=CHUNK_TYPE, HTTP_UPLOAD_OFFSET='0', CONTENT_LENGTH='abc',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.get().offset, 0)
+
+    def test_finalize_incomplete(self):
+        """Тест на отказ завершить неполную загрузку."""
+        upload_id = self.start()
+        self.send(upload_id, 0, self.data[:10])
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_finalize_invalid_image(self):
+        """Тест на проверку изображения при завершении."""
+        self.data = b'not an image'
+        upload_id = self.start()
+        self.send_all(upload_id)
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_cancel_upload(self):
+        """Тест на отмену загрузки."""
+        upload_id = self.start()
+
+        res = self.client.delete(upload_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_other_user_upload_not_found(self):
+        """Тест на недоступность чужой загрузки."""
+        upload_id = self.start()
+        other = User.objects.create_user('other@appdev.com', 'testpass')
+        self.client.force_authenticate(other)
+
+        res = self.send(upload_id, 0, self.data[:10])
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
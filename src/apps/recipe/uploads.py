@@ -0,0 +1,74 @@
+import fcntl
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+
+BLOCK_SIZE = 64 * 1024  # столько байт тела запроса держится в памяти одновременно
+
+
+class UploadConflict(Exception):
+    """Часть пришла не с той позиции или в загрузку уже пишет другой запрос."""
+
+
+class UploadedPart(UploadedFile):
+    """Собранный файл загрузки для ImageField.
+
+    Наличие temporary_file_path позволяет проверке изображения и хранилищу
+    читать файл с диска, не загружая его в память целиком.
+    """
+
+    def __init__(self, path, name, size):
+        super().__init__(open(path, 'rb'), name=name, size=size)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def create_part(upload):
+    """Создает пустой файл для частей загрузки."""
+    os.makedirs(settings.RECIPE_UPLOAD_DIR, exist_ok=True)
+    open(upload.path, 'xb').close()
+
+
+def append_chunk(upload, offset, stream, length):
+    """Дописывает часть тела запроса с позиции offset.
+
+    Тело читается блоками, поэтому память не зависит от размера части.
+    Позиция в БД обновляется под блокировкой файла, так что параллельные
+    запросы к одной загрузке не перезапишут друг друга. Возвращает число
+    записанных байт: при обрыве соединения оно меньше length, и клиент
+    продолжит с новой позиции.
+    """
+    written = 0
+    with open(upload.path, 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict
+        upload.refresh_from_db(fields=['offset'])
+        if offset != upload.offset:
+            raise UploadConflict
+
+        part.seek(offset)
+        part.truncate()  # отбрасывает хвост прерванной записи
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            part.write(block)
+            written += len(block)
+        part.flush()
+
+        upload.offset += written
+        upload.save(update_fields=['offset'])
+    return written
+
+
+def remove_part(upload):
+    try:
+        os.unlink(upload.path)
+    except FileNotFoundError:
+        pass
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 
 router = DefaultRouter()
@@ -9,8 +9,19 @@ router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
 
+# Те же list и retrieve без перехода в поток под ASGI (только чтение)
+async_urlpatterns = [
+    path('tags/', async_views.AsyncTagView.as_view(), name='async-tag-list'),
+    path('tags/<int:pk>/', async_views.AsyncTagView.as_view(), name='async-tag-detail'),
+    path('ingredients/', async_views.AsyncIngredientView.as_view(), name='async-ingredient-list'),
+    path('ingredients/<int:pk>/', async_views.AsyncIngredientView.as_view(), name='async-ingredient-detail'),
+    path('recipes/', async_views.AsyncRecipeView.as_view(), name='async-recipe-list'),
+    path('recipes/<int:pk>/', async_views.AsyncRecipeView.as_view(), name='async-recipe-detail'),
+]
+
 app_name = 'recipe'
 
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
@@ -1,35 +1,117 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import BooleanField, Case, Exists, F, FloatField, OuterRef, Prefetch, Q, When
+from django.db import transaction
+from django.db.models.functions import Cast, Upper
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.text import compress_sequence
 from rest_framework import viewsets, mixins, serializers, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from core.models import Tag, Ingredient, Recipe
+from core.authentication import CachedTokenAuthentication
+from core.cache import TTLCache
+from core.models import ImageUpload, Tag, Ingredient, Recipe
 from recipe import serializers
+from recipe.cache import CachedListMixin, bump_user_version, get_user_version
+from recipe.export import EXPORT_COLUMNS, accepts_gzip, buffered, iter_recipes
+from recipe.images import schedule_derivatives
+from recipe.pagination import KeysetPagination
+from recipe.renderers import CSVRenderer, NDJSONRenderer
+from recipe.uploads import UploadConflict, UploadedPart, append_chunk, create_part, remove_part
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+UPLOAD_ID_PATTERN = r'(?P<upload_id>[0-9a-f-]{36})'
+
+# Короткоживущий кэш подсказок: при наборе одни и те же префиксы запрашиваются подряд
+suggest_cache = TTLCache(maxsize=settings.SUGGEST_CACHE_SIZE, ttl=settings.SUGGEST_CACHE_TTL)
+
+
+class BaseRecipeAttrViewSet(CachedListMixin,
+                                viewsets.GenericViewSet,
                                 mixins.ListModelMixin,
                                 mixins.CreateModelMixin):
         """Базовый класс для управления атрибутами рецепта."""
-        authentication_classes = (TokenAuthentication,)
+        authentication_classes = (CachedTokenAuthentication,)
         permission_classes = (IsAuthenticated,)
+        pagination_class = KeysetPagination
+        ordering = 'name'
+        ordering_fields = ('id', 'name', 'recipe_count')  # для каждого есть индекс (user, поле, id)
 
         def get_queryset(self):
             """Возвращает объекты для текущего пользователя."""
             assigned_only = bool(
                 int(self.request.query_params.get('assigned_only', 0))  # Преобразование строки в число
             )
-            queryset = self.queryset
+            queryset = self.queryset.filter(user=self.request.user)
             if assigned_only:
-                queryset = queryset.filter(recipe__isnull=False)  # Вывод объектов, которые присвоены рецептам
+                # Полусоединение: без размножения строк по рецептам и без DISTINCT
+                queryset = queryset.filter(Exists(self.queryset.recipe_links()))
 
-            return queryset.filter(user=self.request.user).order_by('name').distinct()
+            return queryset.order_by('name')
 
         def perform_create(self, serializer):
             """Создание нового объекта."""
             serializer.save(user=self.request.user)
 
+        @action(methods=['POST'], detail=False, serializer_class=serializers.RecipeAttrBulkSerializer)
+        def bulk(self, request):
+            """Находит или создает объекты по списку имен одним запросом."""
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+
+            rows = self.queryset.get_or_create_many(request.user, serializer.validated_data['names'])
+            if any(created for _, _, created in rows):
+                bump_user_version(request.user.pk)  # вставка в обход post_save
+            data = [{'id': pk, 'name': name, 'created': created} for pk, name, created in rows]
+            return Response(data, status=status.HTTP_200_OK)
+
+        @action(methods=['GET'], detail=False)
+        def suggest(self, request):
+            """Подсказки имен по префиксу и нечеткому совпадению."""
+            text = request.query_params.get('q', '').strip()
+            try:
+                limit = int(request.query_params.get('limit', settings.SUGGEST_LIMIT))
+            except ValueError:
+                limit = settings.SUGGEST_LIMIT
+            limit = max(1, min(limit, settings.SUGGEST_MAX_LIMIT))
+            if not text:
+                return Response([])
+
+            key = (
+                self.queryset.model._meta.label, request.user.pk,
+                get_user_version(request.user.pk), text.upper(), limit,
+            )
+            data = suggest_cache.get(key)
+            if data is None:
+                data = list(self.get_serializer(self._suggestions(text, limit), many=True).data)
+                suggest_cache.set(key, data)
+
+            return Response(data)
+
+        def _suggestions(self, text, limit):
+            """Лучшие совпадения: сначала по префиксу, затем по сходству триграмм."""
+            pattern = text.upper()  # индекс построен по UPPER(name)
+            return (
+                self.queryset.filter(user=self.request.user)
+                .alias(upper_name=Upper('name'))
+                .filter(Q(upper_name__startswith=pattern) | Q(upper_name__trigram_similar=pattern))
+                .annotate(
+                    is_prefix=Case(
+                        When(upper_name__startswith=pattern, then=True),
+                        default=False,
+                        output_field=BooleanField(),
+                    ),
+                    similarity=TrigramSimilarity(F('upper_name'), pattern),
+                )
+                .order_by('-is_prefix', '-similarity', 'name')[:limit]
+            )
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Управление рецептами."""
@@ -43,12 +125,19 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, viewsets.ModelViewSet):
     """Управление рецептами."""
     serializer_class = serializers.RecipeSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = Recipe.objects.defer('search_vector')  # поисковый вектор нужен только в WHERE
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering_fields = ('id', 'price', 'time_minutes', 'title')  # для каждого есть индекс (user, поле, id)
+
+    @property
+    def ordering(self):
+        """Результаты поиска по умолчанию сортируются по релевантности."""
+        return '-rank' if self.request.query_params.get('search') else 'id'
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
@@ -58,15 +147,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Retrieve the recipes for the authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('search')
         queryset = self.queryset
+        if search:
+            query = SearchQuery(search, search_type='websearch', config=settings.RECIPE_SEARCH_CONFIG)
+            queryset = queryset.filter(search_vector=query).annotate(
+                # double precision, чтобы значение в курсоре точно совпадало с вычисленным в БД
+                rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+            )
+        # Полусоединение через EXISTS не размножает рецепты с несколькими совпадениями
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(Exists(Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+            )))
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = queryset.filter(Exists(Recipe.ingredients.through.objects.filter(
+                recipe_id=OuterRef('pk'), ingredient_id__in=ingredient_ids
+            )))
+
+        queryset = queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            # Список сериализуется из строк (с rank поиска для курсора), связи читает RecipeRowSerializer
+            return queryset.values(*serializers.RecipeRowSerializer.row_fields, *queryset.query.annotations)
+        return self._prefetch_relations(queryset)
+
+    def _prefetch_relations(self, queryset):
+        """Подгружает теги и ингредиенты фиксированным числом запросов."""
+        if self.action not in ('retrieve', 'update', 'partial_update', 'bulk'):
+            return queryset  # Остальным действиям связи не нужны
+
+        # После записи нужны только id, для детального представления ещё и name
+        fields = ('id', 'name') if self.action == 'retrieve' else ('id',)
+        return queryset.prefetch_related(
+            Prefetch('ingredients', queryset=Ingredient.objects.only(*fields).order_by('id')),
+            Prefetch('tags', queryset=Tag.objects.only(*fields).order_by('id')),
+        )
+
+    def _recipe_state_queryset(self, lock=False):
+        """Версия и время изменения рецепта без загрузки самого рецепта и связей."""
+        queryset = Recipe.objects.filter(pk=self.kwargs['pk'], user=self.request.user)
+        if lock:
+            queryset = queryset.select_for_update()
+        return queryset.values('id', 'version', 'updated_at')
+
+    def _recipe_state(self, lock=False):
+        return self._recipe_state_queryset(lock).first()
+
+    def _validators(self, state):
+        """ETag и Last-Modified для состояния рецепта."""
+        etag = quote_etag(f"{state['id']}-{state['version']}-{self.request.accepted_renderer.format}")
+        return etag, int(state['updated_at'].timestamp())
+
+    def _with_validators(self, response, state):
+        if state is not None and response.status_code == 200:
+            etag, last_modified = self._validators(state)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
 
-        return queryset.filter(user=self.request.user)
+    def retrieve(self, request, *args, **kwargs):
+        """Детальная информация о рецепте, 304 если у клиента актуальная версия."""
+        if 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers:
+            state = self._recipe_state()
+            if state is None:
+                raise Http404
+            etag, last_modified = self._validators(state)
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified  # сериализатор и связи не понадобились
+
+        instance = self.get_object()
+        response = Response(self.get_serializer(instance).data)
+        return self._with_validators(response, {
+            'id': instance.id, 'version': instance.version, 'updated_at': instance.updated_at,
+        })
+
+    def update(self, request, *args, **kwargs):
+        """Обновление рецепта; при If-Match устаревшая версия отклоняется с 412."""
+        if 'If-Match' in request.headers or 'If-Unmodified-Since' in request.headers:
+            with transaction.atomic():
+                # Строка блокируется до конца транзакции: параллельная правка
+                # с тем же ETag дождется этой и получит 412
+                state = self._recipe_state(lock=True)
+                if state is None:
+                    raise Http404
+                etag, last_modified = self._validators(state)
+                failed = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if failed is not None:
+                    return failed
+                response = super().update(request, *args, **kwargs)
+        else:
+            response = super().update(request, *args, **kwargs)
+
+        # Версия выросла и при сохранении, и при изменении связей
+        return self._with_validators(response, self._recipe_state())
 
     def perform_create(self, serializer):
         """Создание нового объекта."""
@@ -74,10 +251,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         """Возвращает правильный сериализатор."""
-        if self.action == 'retrieve':
+        if self.action == 'list':
+            return serializers.RecipeRowSerializer
+        elif self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
 
         return self.serializer_class
 
@@ -85,6 +266,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Создание нового объекта."""
         serializer.save(user=self.request.user)  # Добавление пользователя к рецепту
 
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Создание и обновление пакета рецептов."""
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=settings.RECIPE_BULK_MAX_ITEMS
+        )
+        serializer.is_valid(raise_exception=True)
+        ids = [recipe.pk for recipe in serializer.save(user=request.user)]
+
+        recipes = self._prefetch_relations(Recipe.objects.filter(pk__in=ids)).in_bulk()
+        data = serializers.RecipeSerializer(
+            [recipes[pk] for pk in ids], many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=False, renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        """Выгрузка всех рецептов пользователя потоком в NDJSON или CSV (?format=).
+
+        Ответ формируется по мере чтения из БД и при Accept-Encoding: gzip
+        сжимается на лету, так что память не зависит от размера аккаунта.
+        """
+        renderer = request.accepted_renderer
+        rows = iter_recipes(
+            Recipe.objects.filter(user=request.user), settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        if isinstance(renderer, CSVRenderer):
+            pieces = renderer.render_rows(rows, header=EXPORT_COLUMNS)
+        else:
+            pieces = renderer.render_rows(rows)
+        content = buffered(pieces, renderer.charset)
+
+        gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if gzip:
+            content = compress_sequence(content)
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="recipes.{renderer.format}"'
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
 
     @action(methods=['POST'], detail=True, url_path='upload-image')  # Добавление действия к рецепту
     def upload_image(self, request, pk=None):
@@ -94,6 +316,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            schedule_derivatives(recipe)  # ответ не ждет обработки изображения
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['POST'], detail=True, url_path='uploads', serializer_class=serializers.ImageUploadSerializer)
+    def create_upload(self, request, pk=None):
+        """Начало загрузки изображения по частям."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(recipe=recipe)
+        create_part(upload)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=self._upload_headers(upload))
+
+    @action(
+        methods=['GET', 'PATCH', 'DELETE'], detail=True, url_path=f'uploads/{UPLOAD_ID_PATTERN}',
+        serializer_class=serializers.ImageUploadSerializer,
+    )
+    def upload(self, request, pk=None, upload_id=None):
+        """Состояние загрузки, прием очередной части с позиции Upload-Offset или отмена."""
+        upload = get_object_or_404(ImageUpload, pk=upload_id, recipe=self.get_object())
+        if request.method == 'DELETE':
+            remove_part(upload)
+            upload.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if request.method == 'PATCH':
+            try:
+                offset = int(request.headers['Upload-Offset'])
+            except (KeyError, ValueError):
+                raise ValidationError({'Upload-Offset': ['A valid integer is required.']})
+            if not request.META.get('CONTENT_LENGTH'):
+                # Без длины (Transfer-Encoding: chunked) лимиты не проверить до чтения тела
+                return Response(
+                    {'detail': 'Content-Length is required.'},
+                    status=status.HTTP_411_LENGTH_REQUIRED,
+                    headers=self._upload_headers(upload),
+                )
+            try:
+                length = int(request.META['CONTENT_LENGTH'])
+                if length < 0:
+                    raise ValueError
+            except ValueError:
+                raise ValidationError({'Content-Length': ['A valid integer is required.']})
+            # Лимиты проверяются по заголовкам, до чтения тела
+            if length > settings.RECIPE_UPLOAD_MAX_CHUNK or offset + length > upload.size:
+                return Response(
+                    {'detail': 'Chunk exceeds the chunk size limit or the declared upload size.'},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    headers=self._upload_headers(upload),
+                )
+            try:
+                append_chunk(upload, offset, request.stream, length)
+            except UploadConflict:
+                return Response(
+                    {'detail': 'Offset does not match or the upload is busy.', 'offset': upload.offset},
+                    status=status.HTTP_409_CONFLICT,
+                    headers=self._upload_headers(upload),
+                )
+
+        return Response(self.get_serializer(upload).data, headers=self._upload_headers(upload))
+
+    @action(
+        methods=['POST'], detail=True, url_path=f'uploads/{UPLOAD_ID_PATTERN}/finalize',
+        serializer_class=serializers.RecipeImageSerializer,
+    )
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        """Завершение загрузки: проверка изображения и привязка к рецепту."""
+        recipe = self.get_object()
+        with transaction.atomic():
+            upload = get_object_or_404(
+                ImageUpload.objects.select_for_update(), pk=upload_id, recipe=recipe
+            )
+            if upload.offset != upload.size:
+                return Response(
+                    {'detail': 'Upload is incomplete.', 'offset': upload.offset},
+                    status=status.HTTP_409_CONFLICT,
+                    headers=self._upload_headers(upload),
+                )
+
+            # Изображение проверяется один раз, по собранному файлу
+            with UploadedPart(upload.path, upload.filename, upload.size) as part:
+                serializer = self.get_serializer(recipe, data={'image': part})
+                valid = serializer.is_valid()
+                if valid:
+                    serializer.save()
+            upload.delete()
+        remove_part(upload)
+
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        schedule_derivatives(recipe)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _upload_headers(upload):
+        return {'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.size)}
+
@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Запросы выполняются в отдельных потоках, постоянные соединения в них не переиспользуются;
+# для переиспользования соединений под ASGI нужен пул (DB_POOL=1)
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "core",
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestTimingMiddleware",  # первым, чтобы время включало остальные middleware
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -63,16 +65,54 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 # Database
+# core.db - backend PostgreSQL с метриками получения соединения (core.metrics).
+# Без пула соединение потока живет DB_CONN_MAX_AGE секунд и перед переиспользованием
+# проверяется (CONN_HEALTH_CHECKS). С DB_POOL=1 соединения берутся из пула psycopg 3
+# (pip install "psycopg[binary,pool]"); пул тоже проверяет соединение перед выдачей
+# и заменяет разорванные. Под ASGI каждый запрос выполняется в своем потоке и
+# постоянные соединения не переиспользуются: config/asgi.py отключает их, нужен пул.
+DB_POOL = os.getenv("DB_POOL", "0") == "1"
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "core.db",
         "NAME": os.getenv("POSTGRES_DB", "recipe"),
         "USER": os.getenv("POSTGRES_USER", "sonya"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "sonya"),
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", 5432),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", 60)),  # пул несовместим с CONN_MAX_AGE
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),  # на процесс, в сумме не больше max_connections
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),  # ожидание свободного соединения, секунды
+        "max_waiting": int(os.getenv("DB_POOL_MAX_WAITING", 0)),  # очередь ожидающих, 0 - без ограничения
+        "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+        "name": "default",
+    }
+
+# Cache
+# LocMemCache вытесняет записи по LRU при превышении MAX_ENTRIES и по TIMEOUT;
+# при нескольких процессах нужен общий backend, например RedisCache
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "recipe-api"),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+        },
+    }
+}
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))  # секунды
+TOKEN_CACHE_ALIAS = "default"
+TOKEN_CACHE_TIMEOUT = int(os.getenv("TOKEN_CACHE_TIMEOUT", 60))  # секунды
 
 
 # Password validation
@@ -101,11 +141,23 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = "/static/"
-MEDIA = "/media/"
+MEDIA_URL = "/media/"
 
 MEDIA_ROOT = "/vol/web/media"  # в контейнере
 STATIC_ROOT = "/vol/web/static"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Изображения рецептов по хэшу содержимого; FileSystemStorage вернет плоский каталог
+    "recipe_images": {"BACKEND": os.getenv("RECIPE_IMAGE_STORAGE", "core.storage.ContentAddressedStorage")},
+}
+
+# Отдача медиа, см. core.views.serve_media
+MEDIA_ACCEL = os.getenv("MEDIA_ACCEL", "")  # "x-accel-redirect" (nginx), "x-sendfile" (Apache) или пусто
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")  # internal location в nginx
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", 60 * 60))  # секунды для файлов не по хэшу
+
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -113,6 +165,67 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Custom user model
 AUTH_USER_MODEL = "core.User"
 
+# Pagination
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 200))  # верхняя граница для ?page_size=
+
+# Bulk writes
+RECIPE_BULK_MAX_ITEMS = int(os.getenv("RECIPE_BULK_MAX_ITEMS", 1000))  # рецептов в одном POST /recipes/bulk/
+
+# Export
+RECIPE_EXPORT_CHUNK_SIZE = int(os.getenv("RECIPE_EXPORT_CHUNK_SIZE", 2000))  # строк за одно чтение курсора
+
+# Full-text search
+RECIPE_SEARCH_CONFIG = os.getenv("RECIPE_SEARCH_CONFIG", "simple")  # конфигурация text search в Postgres
+
+# Tag and ingredient suggestions
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", 10))
+SUGGEST_MAX_LIMIT = int(os.getenv("SUGGEST_MAX_LIMIT", 25))
+SUGGEST_CACHE_TTL = float(os.getenv("SUGGEST_CACHE_TTL", 5))  # секунды
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", 2048))
+
+# Recipe image derivatives
+RECIPE_IMAGE_SIZES = {"small": 160, "medium": 480, "large": 1024}  # наибольшая сторона в пикселях
+RECIPE_IMAGE_FORMATS = ("webp", "jpeg")
+RECIPE_IMAGE_WORKERS = int(os.getenv("RECIPE_IMAGE_WORKERS", 2))  # потоков на процесс
+
+# Resumable image uploads
+RECIPE_UPLOAD_DIR = os.getenv("RECIPE_UPLOAD_DIR", os.path.join(MEDIA_ROOT, ".uploads"))
+RECIPE_UPLOAD_MAX_SIZE = int(os.getenv("RECIPE_UPLOAD_MAX_SIZE", 20 * 1024 * 1024))  # байт на изображение
+RECIPE_UPLOAD_MAX_CHUNK = int(os.getenv("RECIPE_UPLOAD_MAX_CHUNK", 5 * 1024 * 1024))  # байт на один PATCH
+RECIPE_UPLOAD_TTL = int(os.getenv("RECIPE_UPLOAD_TTL", 24 * 60 * 60))  # секунды до удаления незавершенной загрузки
+
+# Request timing, см. core.middleware.RequestTimingMiddleware
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "1") == "1"
+REQUEST_TIMING_SQL_SAMPLE_RATE = float(os.getenv("REQUEST_TIMING_SQL_SAMPLE_RATE", 0.01))  # доля запросов с текстом SQL
+
+# Metrics, см. core.metrics; /metrics закрывается токеном, если он задан
+# При нескольких процессах (gunicorn, uvicorn --workers) значения пишутся в файлы
+# <pid>.db этого каталога и суммируются при чтении; каталог очищается перед запуском сервера
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Health checks, см. core.health; /healthz отвечает 200, пока процесс жив, /readyz - 503 при проблемах с БД
+HEALTH_CHECK_TTL = float(os.getenv("HEALTH_CHECK_TTL", 2))  # секунды между проверками БД в процессе
+HEALTH_DB_LATENCY_LIMIT = float(os.getenv("HEALTH_DB_LATENCY_LIMIT", 0.5))  # секунды на SELECT 1
+HEALTH_POOL_MAX_WAITING = int(os.getenv("HEALTH_POOL_MAX_WAITING", 10))  # запросов в очереди пула
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            # Под manage.py test строка на каждый запрос только засоряет вывод
+            "level": os.getenv("REQUEST_TIMING_LOG_LEVEL", "WARNING" if "test" in sys.argv[1:2] else "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 
 # import os
 #
@@ -1,10 +1,15 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core.views import healthz, metrics, readyz, serve_media
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/user/", include("user.urls"), name="user"),
     path("api/recipe/", include("recipe.urls"), name="recipe"),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path("metrics", metrics, name="metrics"),
+    path("healthz", healthz, name="healthz"),
+    path("readyz", readyz, name="readyz"),
+    re_path(r"^%s(?P<path>.+)$" % settings.MEDIA_URL.lstrip("/"), serve_media, name="media"),
+]